@@ -1,89 +1,395 @@
-import pandas as pd
-from Round2.Round2_DataAnalysis.datamodel import Order, Symbol, TradingState
-from Round2.Round2_DataAnalysis.trader_unfinished import Trader
-from datetime import datetime
-from Round2.Round2_DataAnalysis.datamodel import OrderDepth, ConversionObservation, Observation
+import importlib.util
+import os
+import sys
+import time
+from typing import Dict, List, TextIO
+
+import numpy as np
+
+from Round2.compact_datamodel import Order, Symbol, Trade, TradingState
+from Round2.compact_datamodel import OrderDepth, ConversionObservation, Observation
+from Round2.data_cache import load_observations, load_prices
+from Round2.market_data import ObservationData, PriceData, TradeTape
+from Round2.state_codec import encode_state, encode_tick
+
+POSITION_LIMITS = {
+    'AMETHYSTS': 20, 'STARFRUIT': 20, 'ORCHIDS': 100, 'CHOCOLATE': 250,
+    'STRAWBERRIES': 350, 'ROSES': 60, 'GIFT_BASKET': 60, 'COCONUT': 300, 'COCONUT_COUPON': 600
+}
+
+# The product that can be converted with the south, and what holding it long costs per unit and tick
+CONVERSION_PRODUCT = 'ORCHIDS'
+STORAGE_COST = 0.1
 
 
 class Backtester:
-    def __init__(self, data):
-        self.data = data
-        self.current_index = 0
+    def __init__(self, prices: PriceData, position_limits: Dict[Symbol, int] = POSITION_LIMITS,
+                 observations: ObservationData = None, south_half_spread: float = 0.0,
+                 storage_cost: float = STORAGE_COST, trades: TradeTape = None,
+                 queue_fraction: float = None):
+        """
+        observations are the prices_round_2_day_*.csv series, joined to the
+        ORCHIDS rows by (day, timestamp). They hold one south price, quoted as
+        bidPrice and askPrice south_half_spread either side of it. Without
+        them every ORCHIDS tick gets the old fixed example conditions around
+        the local book.
+
+        trades is the market trade tape of the same days. Its trades are handed
+        to the trader as the market_trades of the following tick, and, when
+        queue_fraction is set, whatever is left of our orders after crossing
+        the book rests at its price for the rest of the tick and fills against
+        them. Trades through our price fill us in full; of the volume traded
+        exactly at our price we get queue_fraction, from 1 (first in the queue)
+        down to 0 (behind everyone else).
+        """
+        self.prices = prices
+        self.position_limits = position_limits
+        self.storage_cost = storage_cost
+        self.queue_fraction = queue_fraction
+        self.reset()
+
+        # Plain Python copies of the columns, indexing these is much cheaper
+        # than pulling NumPy scalars out one at a time on every tick
+        self.products = [prices.products[i] for i in prices.product_ids]
+        self.tick_starts = prices.tick_starts.tolist()
+        self.timestamps = prices.timestamp.tolist()
+        self.best_bids = prices.bid_prices[:, 0].tolist()
+        self.best_asks = prices.ask_prices[:, 0].tolist()
+        self.mid_prices = prices.mid_price.tolist()
+        self.buy_levels = self.build_levels(
+            prices.bid_prices, prices.bid_volumes, 1)
+        self.sell_levels = self.build_levels(
+            prices.ask_prices, prices.ask_volumes, -1)
+        self.conversion_values = self.build_conversion_values(observations, south_half_spread)
+        self.tick_trades = self.build_tick_trades(trades)
+
+    def reset(self):
+        """Rewind to the first tick with no positions, keeping the precomputed book levels."""
+        self.current_tick = 0
+        # Row of each product in the tick that was handed out last
+        self.current_rows: Dict[Symbol, int] = {}
+        # Tape trades of that tick by symbol, the ones resting orders can fill against
+        self.current_trades: Dict[Symbol, List[Trade]] = {}
+
+        self.position: Dict[Symbol, int] = {}
+        self.cash: Dict[Symbol, float] = {}
+        self.last_mid: Dict[Symbol, float] = {}
+        self.own_trades: Dict[Symbol, List[Trade]] = {}
+        # traderData returned by the last Trader.run, handed back on the next tick
+        self.trader_data = ''
+
+    @staticmethod
+    def build_levels(prices, volumes, sign):
+        # (price, volume) pairs of every row, ready to be turned into a dict
+        levels = []
+        for row_prices, row_volumes in zip(prices.tolist(), volumes.tolist()):
+            levels.append([(int(price), sign * volume) for price, volume
+                           in zip(row_prices, row_volumes) if volume])
+        return levels
+
+    def build_conversion_values(self, observations, south_half_spread):
+        # ConversionObservation arguments of every ORCHIDS row, None elsewhere
+        values = [None] * len(self.prices)
+        if CONVERSION_PRODUCT not in self.prices.product_index:
+            return values
+        rows = self.prices[CONVERSION_PRODUCT].rows
+        if observations is None:
+            for row in rows.tolist():
+                values[row] = (self.best_bids[row], self.best_asks[row], 1.5, 0.5, 0.3, 2500, 50)
+            return values
+
+        matches = observations.rows_of(self.prices.day[rows], self.prices.timestamp[rows])
+        found = matches >= 0
+        south = observations['ORCHIDS'][matches[found]]
+        columns = zip(
+            (south - south_half_spread).tolist(),
+            (south + south_half_spread).tolist(),
+            *(observations[name][matches[found]].tolist() for name in
+              ('TRANSPORT_FEES', 'EXPORT_TARIFF', 'IMPORT_TARIFF', 'SUNLIGHT', 'HUMIDITY')))
+        for row, row_values in zip(rows[found].tolist(), columns):
+            values[row] = row_values
+        return values
+
+    def build_tick_trades(self, trades):
+        # Tape trades bucketed by tick and symbol once, so a tick only has to index them
+        buckets = [{} for _ in range(self.prices.tick_count)]
+        if trades is None or not len(trades):
+            return buckets
+        first_rows = self.prices.tick_starts[:-1]
+        tick_keys = np.asarray(self.prices.day)[first_rows] * 10_000_000 + np.asarray(self.prices.timestamp)[first_rows]
+        trade_keys = trades.day * 10_000_000 + trades.timestamp
+        ticks = np.minimum(np.searchsorted(tick_keys, trade_keys), len(tick_keys) - 1)
+        found = tick_keys[ticks] == trade_keys
+
+        for tick, symbol, price, quantity, buyer, seller, timestamp in zip(
+                ticks[found].tolist(), trades.symbol[found].tolist(), trades.price[found].tolist(),
+                trades.quantity[found].tolist(), trades.buyer[found].tolist(),
+                trades.seller[found].tolist(), trades.timestamp[found].tolist()):
+            buckets[tick].setdefault(symbol, []).append(
+                Trade(symbol, int(price), quantity, buyer, seller, timestamp))
+        return buckets
 
     def get_next_market_state(self):
-        if self.current_index < len(self.data):
-            row = self.data.iloc[self.current_index]
-            self.current_index += 1
-            return self.convert_row_to_trading_state(row)
+        if self.current_tick < self.prices.tick_count:
+            start = self.tick_starts[self.current_tick]
+            end = self.tick_starts[self.current_tick + 1]
+            self.current_rows = {
+                self.products[index]: index for index in range(start, end)}
+            state = self.convert_tick_to_trading_state(start)
+            self.current_trades = self.tick_trades[self.current_tick]
+            self.current_tick += 1
+            return state
         else:
             return None
 
-    def convert_row_to_trading_state(self, row):
-        # Mock the necessary structures
-        # Mock timestamp if not provided
-        timestamp = int(datetime.now().timestamp())
+    def convert_tick_to_trading_state(self, start):
         listings = {}  # Empty, as the specific listings might not be necessary for simple backtests
-        order_depths = {
-            'ORCHIDS': OrderDepth()  # Assumes OrderDepth manages a dictionary of buy and sell orders
-        }
-        order_depths['ORCHIDS'].buy_orders = {
-            row['bid_price_1']: row['bid_volume_1']}
-        order_depths['ORCHIDS'].sell_orders = {
-            row['ask_price_1']: row['ask_volume_1']}
-        own_trades = {}
-        market_trades = {}
-        position = {'ORCHIDS': 0}  # Mock position, adjust based on actual data
+        order_depths = {}
+        for product, index in self.current_rows.items():
+            order_depth = OrderDepth()
+            order_depth.buy_orders = dict(self.buy_levels[index])
+            order_depth.sell_orders = dict(self.sell_levels[index])
+            order_depths[product] = order_depth
+        # What traded on the tape since the previous state
+        market_trades = self.tick_trades[self.current_tick - 1] if self.current_tick else {}
+        conversion_observations = {}
+        index = self.current_rows.get(CONVERSION_PRODUCT)
+        if index is not None and self.conversion_values[index] is not None:
+            conversion_observations[CONVERSION_PRODUCT] = ConversionObservation(
+                *self.conversion_values[index])
         observations = Observation(
             plainValueObservations={},
-            conversionObservations={
-                'ORCHIDS': ConversionObservation(
-                    bidPrice=row['bid_price_1'],
-                    askPrice=row['ask_price_1'],
-                    transportFees=1.5,  # Example value
-                    exportTariff=0.5,   # Example value
-                    importTariff=0.3,   # Example value
-                    sunlight=2500,      # Example value
-                    humidity=50         # Example value
-                )
-            }
+            conversionObservations=conversion_observations
         )
 
         # Create the TradingState
         state = TradingState(
-            traderData='Sample trader data',
-            timestamp=timestamp,
+            traderData=self.trader_data,
+            timestamp=self.timestamps[start],
             listings=listings,
             order_depths=order_depths,
-            own_trades=own_trades,
+            own_trades=self.own_trades,
             market_trades=market_trades,
-            position=position,
+            position=dict(self.position),
             observations=observations
         )
         return state
 
+    def execute_orders(self, orders: Dict[Symbol, List[Order]]):
+        """Match the orders returned by Trader.run against the books of the current tick."""
+        self.own_trades = {}
+        for product, index in self.current_rows.items():
+            self.last_mid[product] = self.mid_prices[index]
+            product_orders = orders.get(product)
+            if product_orders:
+                self.match_product_orders(product, index, product_orders)
+
+    def execute_conversions(self, conversions: int):
+        """
+        Trade ORCHIDS with the south at the tick's observation: buy at the ask
+        plus transport fees and import tariff to cover a short position, sell at
+        the bid minus transport fees and export tariff to cover a long one.
+        Like the exchange, a request that does not bring the position closer to
+        flat is ignored.
+        """
+        index = self.current_rows.get(CONVERSION_PRODUCT)
+        if not conversions or index is None or self.conversion_values[index] is None:
+            return
+        position = self.position.get(CONVERSION_PRODUCT, 0)
+        if conversions * position >= 0 or abs(conversions) > abs(position):
+            return
+
+        bid, ask, transport_fees, export_tariff, import_tariff = self.conversion_values[index][:5]
+        if conversions > 0:
+            price = ask + transport_fees + import_tariff
+        else:
+            price = bid - transport_fees - export_tariff
+        self.cash[CONVERSION_PRODUCT] = self.cash.get(CONVERSION_PRODUCT, 0.0) - conversions * price
+        self.position[CONVERSION_PRODUCT] = position + conversions
+
+    def charge_storage(self):
+        """Pay for every unit of ORCHIDS held long through a tick; short positions cost nothing."""
+        position = self.position.get(CONVERSION_PRODUCT, 0)
+        if position > 0 and CONVERSION_PRODUCT in self.current_rows:
+            self.cash[CONVERSION_PRODUCT] = self.cash.get(CONVERSION_PRODUCT, 0.0) - \
+                self.storage_cost * position
+
+    def match_product_orders(self, product, index, orders):
+        position = self.position.get(product, 0)
+        limit = self.position_limits[product]
+
+        # Like the exchange, cancel every order of a product when filling all
+        # buy or all sell orders could take the position past its limit
+        total_buy = 0
+        total_sell = 0
+        for order in orders:
+            if order.quantity > 0:
+                total_buy += order.quantity
+            else:
+                total_sell -= order.quantity
+        if position + total_buy > limit or position - total_sell < -limit:
+            return
+
+        timestamp = self.timestamps[index]
+        cash = self.cash.get(product, 0.0)
+        trades = []
+        # Volume already taken out of each level by earlier orders of this tick
+        bought = None
+        sold = None
+
+        # What is left of each order after crossing the book, as (price, signed quantity)
+        resting = []
+        for order in orders:
+            quantity = order.quantity
+            if quantity > 0:
+                levels = self.sell_levels[index]
+                if bought is None:
+                    bought = [0] * len(levels)
+                for level, (price, volume) in enumerate(levels):
+                    if price > order.price or quantity == 0:
+                        break
+                    fill = min(quantity, -volume - bought[level])
+                    if fill > 0:
+                        bought[level] += fill
+                        quantity -= fill
+                        position += fill
+                        cash -= price * fill
+                        trades.append(
+                            Trade(product, price, fill, 'SUBMISSION', '', timestamp))
+                if quantity:
+                    resting.append((order.price, quantity))
+            elif quantity < 0:
+                quantity = -quantity
+                levels = self.buy_levels[index]
+                if sold is None:
+                    sold = [0] * len(levels)
+                for level, (price, volume) in enumerate(levels):
+                    if price < order.price or quantity == 0:
+                        break
+                    fill = min(quantity, volume - sold[level])
+                    if fill > 0:
+                        sold[level] += fill
+                        quantity -= fill
+                        position -= fill
+                        cash += price * fill
+                        trades.append(
+                            Trade(product, price, fill, '', 'SUBMISSION', timestamp))
+                if quantity:
+                    resting.append((order.price, -quantity))
+
+        market_trades = self.current_trades.get(product)
+        if resting and market_trades and self.queue_fraction is not None:
+            for price, quantity, counterparty in self.match_resting_orders(resting, market_trades):
+                position += quantity
+                cash -= price * quantity
+                if quantity > 0:
+                    trades.append(Trade(product, price, quantity, 'SUBMISSION', counterparty, timestamp))
+                else:
+                    trades.append(Trade(product, price, -quantity, counterparty, 'SUBMISSION', timestamp))
+
+        if trades:
+            self.position[product] = position
+            self.cash[product] = cash
+            self.own_trades[product] = trades
+
+    def match_resting_orders(self, resting, market_trades):
+        """
+        Fill resting orders, best priced first, against the tick's tape trades
+        that reach them, at the order's own price. Each trade's volume can only
+        be used once, by either side.
+        """
+        left = [trade.quantity for trade in market_trades]
+        fills = []
+        for price, quantity in sorted(resting, key=lambda order: -order[0] if order[1] > 0 else order[0]):
+            for i, trade in enumerate(market_trades):
+                if not left[i]:
+                    continue
+                if trade.price == price:
+                    available = int(left[i] * self.queue_fraction)
+                elif (trade.price < price) == (quantity > 0):
+                    available = left[i]
+                else:
+                    continue
+                fill = min(abs(quantity), available)
+                if fill:
+                    left[i] -= fill
+                    signed = fill if quantity > 0 else -fill
+                    quantity -= signed
+                    # The other side of the tape trade is who we take the place of
+                    fills.append((price, signed, trade.seller if signed > 0 else trade.buyer))
+                if not quantity:
+                    break
+        return fills
+
+    def profit_and_loss(self) -> Dict[Symbol, float]:
+        """Cash plus the open position marked to the last mid price, per product."""
+        return {
+            product: self.cash.get(product, 0.0) +
+            self.position.get(product, 0) * self.last_mid.get(product, 0.0)
+            for product in set(self.cash) | set(self.position)
+        }
+
+    def run(self, trader, recording: TextIO = None) -> Dict[Symbol, float]:
+        """
+        Replay every tick through trader.run and return the final PnL per
+        product. With a recording file, each tick's state and what run returned
+        are written to it as a line of JSON, to be read back with
+        state_codec.read_recording.
+        """
+        state = self.get_next_market_state()
+        while state is not None:
+            # Encoded before run, in case the Trader changes what it was handed
+            state_json = encode_state(state) if recording is not None else None
+            # Run trading logic
+            results, conversions, traderData = trader.run(state)
+            if recording is not None:
+                recording.write(encode_tick(state_json, results, conversions, traderData) + '\n')
+            self.execute_conversions(conversions)
+            self.execute_orders(results)
+            self.charge_storage()
+            self.trader_data = traderData
+
+            state = self.get_next_market_state()
+
+        return self.profit_and_loss()
+
 
-def simulate_trading():
-    data = pd.read_csv(
-        'Round2/Round2_DataAnalysis/backtester_data.csv', delimiter=';')
-    backtester = Backtester(data)
-    trader = Trader()
+def load_trader_class(trader_path: str):
+    """Import the Trader class of a round's trader file, next to that round's datamodel.py."""
+    directory = os.path.dirname(os.path.abspath(trader_path))
+    if directory in sys.path:
+        sys.path.remove(directory)
+    sys.path.insert(0, directory)
+    # Every round ships its own copy of datamodel.py, don't reuse another round's
+    sys.modules.pop('datamodel', None)
+    name = os.path.basename(directory).lower() + '_trader'
+    spec = importlib.util.spec_from_file_location(name, trader_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.Trader
 
-    total_pnl = 0
 
-    state = backtester.get_next_market_state()
-    while state is not None:
-        # Run trading logic
-        results, conversions, traderData = trader.run(state)
+def simulate_trading(trader, *paths, observation_paths=()):
+    observations = load_observations(*observation_paths) if observation_paths else None
+    backtester = Backtester(load_prices(*paths), observations=observations)
+    return sum(backtester.run(trader).values())
 
-        # Here you would calculate the P&L based on trading results
-        # For simplicity, we're just accumulating a dummy P&L value
-        total_pnl += 0  # Adjust this to use actual results
 
-        state = backtester.get_next_market_state()
+def measure_replay_speed(*paths):
+    backtester = Backtester(load_prices(*paths))
+    start = time.perf_counter()
+    ticks = 0
+    while backtester.get_next_market_state() is not None:
+        ticks += 1
+    return ticks / (time.perf_counter() - start)
 
-    return total_pnl
 
+if __name__ == "__main__":
+    from Round2.trader import Trader
 
-# Call the simulation function
-total_profit = simulate_trading()
-print("Total Profit:", total_profit)
+    if sys.argv[1:]:
+        print("Total Profit:", simulate_trading(Trader(), *sys.argv[1:]))
+    else:
+        print("Total Profit:", simulate_trading(
+            Trader(), 'Round2/Round2_DataAnalysis/data.csv',
+            observation_paths=['Round2/Round2_DataAnalysis/prices_round_2_day_1.csv']))
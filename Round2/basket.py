@@ -0,0 +1,83 @@
+import sys
+from typing import Dict, NamedTuple
+
+import numpy as np
+
+from Round2.data_cache import load_prices
+from Round2.market_data import PriceData
+from Round2.order_book import BookTensor
+
+# One GIFT_BASKET holds 4 CHOCOLATE, 6 STRAWBERRIES and 1 ROSES, the same
+# weights and window as BasketSpread in the Round 3-5 traders
+BASKET = 'GIFT_BASKET'
+BASKET_WEIGHTS = {'CHOCOLATE': 4, 'STRAWBERRIES': 6, 'ROSES': 1}
+SPREAD_WINDOW = 100
+R3 = 'Round3/Round3_Data_Analysis/prices_round_3_day_{}.csv'
+
+
+class SpreadHistory(NamedTuple):
+    """Basket spread of every tick on which all four books have both sides, with its rolling statistics."""
+    day: np.ndarray
+    timestamp: np.ndarray
+    spread: np.ndarray
+    mean: np.ndarray
+    std: np.ndarray
+
+
+def tick_mids(prices: PriceData, products) -> np.ndarray:
+    """
+    (ticks, products) mids from the best bid and ask, NaN where a product is
+    missing or one side of its book is empty, as BookView.mid_price is None.
+    """
+    tensor = BookTensor(prices)
+    return tensor.mid_prices()[:, [tensor.product_index[product] for product in products]]
+
+
+def rolling_stats(spread: np.ndarray, window: int = SPREAD_WINDOW):
+    """
+    Mean and population std of the last window spreads (of all of them while
+    fewer have been seen), worked out from running sums the way
+    BasketSpread.update does. Spreads of half tick mids keep those sums exact,
+    so both give the same numbers to the last bit.
+    """
+    totals = np.cumsum(spread)
+    squares = np.cumsum(spread * spread)
+    totals[window:] = totals[window:] - totals[:-window]
+    squares[window:] = squares[window:] - squares[:-window]
+    counts = np.minimum(np.arange(1, len(spread) + 1), window).astype(np.float64)
+    mean = totals / counts
+    std = np.sqrt(np.maximum(squares - totals * totals / counts, 0.0) / counts)
+    return mean, std
+
+
+def spread_history(prices: PriceData, weights: Dict[str, int] = BASKET_WEIGHTS,
+                   window: int = SPREAD_WINDOW) -> SpreadHistory:
+    """Basket minus weighted constituents over a whole price history, with the statistics restarting every day."""
+    mids = tick_mids(prices, [BASKET] + list(weights))
+    spread = mids[:, 0].copy()
+    for column, weight in enumerate(weights.values(), start=1):
+        spread -= weight * mids[:, column]
+
+    first_rows = prices.tick_starts[:-1]
+    day = np.asarray(prices.day)[first_rows]
+    timestamp = np.asarray(prices.timestamp)[first_rows]
+    quoted = ~np.isnan(spread)
+    day, timestamp, spread = day[quoted], timestamp[quoted], spread[quoted]
+
+    mean = np.empty_like(spread)
+    std = np.empty_like(spread)
+    bounds = np.concatenate(([0], np.flatnonzero(np.diff(day) != 0) + 1, [len(day)]))
+    for start, end in zip(bounds, bounds[1:]):
+        mean[start:end], std[start:end] = rolling_stats(spread[start:end], window)
+    return SpreadHistory(day, timestamp, spread, mean, std)
+
+
+if __name__ == "__main__":
+    days = [int(day) for day in sys.argv[1:]] or [0, 1, 2]
+    history = spread_history(load_prices(*(R3.format(day) for day in days)))
+    for day in days:
+        on_day = history.day == day
+        spread = history.spread[on_day]
+        zscores = (spread - history.mean[on_day]) / np.where(history.std[on_day] > 0, history.std[on_day], np.nan)
+        print(f'day {day}: spread mean {spread.mean():.2f} std {spread.std():.2f} '
+              f'|z| > 2 on {np.mean(np.abs(zscores) > 2):.1%} of {len(spread)} ticks')
@@ -0,0 +1,470 @@
+import argparse
+import contextlib
+import io
+import functools
+import inspect
+import json
+import os
+import sys
+import tracemalloc
+from time import perf_counter_ns
+from typing import Dict, List
+
+import numpy as np
+
+import Round2.backtester
+import Round2.compact_datamodel
+import Round2.Round2_DataAnalysis.datamodel
+from Round2.backtester import Backtester, load_trader_class
+from Round2.data_cache import load_observations, load_prices, load_trades
+from Round2.state_codec import decode_state, encode_state
+
+R1 = 'Round1/Round1_DataAnalysis/prices_round_1_day_{}.csv'
+R3 = 'Round3/Round3_Data_Analysis/prices_round_3_day_{}.csv'
+R4 = 'Round4/Round4_Data_Analysis/prices_round_4_day_{}.csv'
+
+# Trader file and the price files replayed through it, merged into one day so
+# the later rounds see every product they trade
+ROUNDS = {
+    'tutorial': ('tutorial/tutorial.py', [R1.format(0)]),
+    'Round1': ('Round1/trader.py', [R1.format(0)]),
+    'Round2': ('Round2/trader.py', ['Round2/Round2_DataAnalysis/data.csv']),
+    'Round3': ('Round3/trader.py', [R1.format(-2), R3.format(0)]),
+    'Round4': ('Round4/trader.py', [R1.format(-1), R3.format(1), R4.format(1)]),
+    'Round5': ('Round5/trader.py', [R1.format(-2), R3.format(0)]),
+}
+
+BASELINE_PATH = 'Round2/latency_baseline.json'
+
+# The three days of the Round 3 data, each with the Round 1 day traded alongside it
+ROUND3_DAYS = [[R1.format(day - 2), R3.format(day)] for day in (0, 1, 2)]
+# Encode plus decode of the traderData snapshot has to fit in this per tick
+CODEC_BUDGET_US = 100
+# Two days of every round since Round 1 merged, eight products a tick
+FLUSH_PATHS = [R1.format(-1), R3.format(1), R4.format(1)]
+# The ORCHIDS day of Round 2 with its conversion observations
+OBSERVATION_PATHS = ('Round2/Round2_DataAnalysis/data.csv', 'Round2/Round2_DataAnalysis/prices_round_2_day_1.csv')
+# Market trades of the first Round 4 day, for states that carry some
+ROUND4_TRADES = 'Round4/Round4_Data_Analysis/trades_round_4_day_1_nn.csv'
+DATAMODELS = {
+    'datamodel': Round2.Round2_DataAnalysis.datamodel,
+    'compact_datamodel': Round2.compact_datamodel,
+}
+
+
+def summarize(samples: List[int]) -> Dict[str, float]:
+    """p50, p99 and max of a list of nanosecond timings, in microseconds."""
+    micros = np.asarray(samples, dtype=np.float64) / 1000
+    return {
+        'count': len(micros),
+        'p50': float(np.percentile(micros, 50)),
+        'p99': float(np.percentile(micros, 99)),
+        'max': float(micros.max()),
+    }
+
+
+def timed(method, label: str, timings: Dict[str, List[int]]):
+    # Calls that name a product get their own entry, e.g. calc_orders_for_product[ROSES]
+    product_arg = None
+    parameters = list(inspect.signature(method).parameters)
+    if 'product' in parameters:
+        product_arg = parameters.index('product')
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        start = perf_counter_ns()
+        result = method(*args, **kwargs)
+        elapsed = perf_counter_ns() - start
+        key = label
+        if product_arg is not None and len(args) > product_arg:
+            key = f'{label}[{args[product_arg]}]'
+        timings.setdefault(key, []).append(elapsed)
+        return result
+
+    return wrapper
+
+
+def instrument(trader, timings: Dict[str, List[int]]):
+    """
+    Time every method the Trader defines, plus the Logger.flush of the tutorial
+    trader and the traderData codec of the later rounds.
+    """
+    for name, _ in inspect.getmembers(type(trader), inspect.isfunction):
+        if name.startswith('__') or name == 'run':
+            continue
+        setattr(trader, name, timed(getattr(trader, name), name, timings))
+    codec = getattr(trader, 'codec', None)
+    if codec is not None:
+        codec.encode = timed(codec.encode, 'codec.encode', timings)
+        codec.decode = timed(codec.decode, 'codec.decode', timings)
+    logger = getattr(trader, 'logger', None)
+    if logger is not None and hasattr(logger, 'flush'):
+        logger.flush = timed(logger.flush, 'logger.flush', timings)
+
+
+def replay(backtester: Backtester, trader, max_ticks: int = None) -> List[int]:
+    backtester.reset()
+    tick_times = []
+    state = backtester.get_next_market_state()
+    while state is not None and len(tick_times) != max_ticks:
+        start = perf_counter_ns()
+        results, conversions, traderData = trader.run(state)
+        tick_times.append(perf_counter_ns() - start)
+        backtester.execute_orders(results)
+        backtester.trader_data = traderData
+        state = backtester.get_next_market_state()
+    return tick_times
+
+
+def benchmark_round(trader_path: str, paths: List[str], max_ticks: int = None) -> Dict[str, Dict[str, float]]:
+    """
+    Replay real prices through a round's Trader and report its per-tick latency.
+
+    The run entry comes from an uninstrumented pass; the per-method entries from
+    a second pass with every method wrapped, since the wrappers add overhead.
+    """
+    trader_class = load_trader_class(trader_path)
+    backtester = Backtester(load_prices(*paths, day=0))
+    timings: Dict[str, List[int]] = {}
+
+    # The exchange captures whatever the trader prints, so keep paying for it
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        tick_times = replay(backtester, trader_class(), max_ticks)
+        trader = trader_class()
+        instrument(trader, timings)
+        replay(backtester, trader, max_ticks)
+
+    report = {'run': summarize(tick_times)}
+    for label in sorted(timings):
+        report[label] = summarize(timings[label])
+    return report
+
+
+@contextlib.contextmanager
+def use_datamodel(module):
+    """Let the Backtester build its states from the classes of another datamodel module."""
+    names = ('Trade', 'TradingState', 'OrderDepth', 'ConversionObservation', 'Observation')
+    previous = {name: getattr(Round2.backtester, name) for name in names}
+    for name in names:
+        setattr(Round2.backtester, name, getattr(module, name))
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(Round2.backtester, name, value)
+
+
+def benchmark_datamodel(module, trader_path: str = 'Round3/trader.py') -> Dict[str, float]:
+    """
+    Replay the full Round 3 data with the states built from module's classes.
+
+    Returns the replay time with the Round 3 Trader and the memory taken by
+    every state of the replay when they are all kept, as a log tool would.
+    """
+    trader_class = load_trader_class(trader_path)
+    backtesters = [Backtester(load_prices(*paths, day=day)) for day, paths in enumerate(ROUND3_DAYS)]
+    with use_datamodel(module), open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = perf_counter_ns()
+        for backtester in backtesters:
+            backtester.reset()
+            backtester.run(trader_class())
+        elapsed = perf_counter_ns() - start
+
+        tracemalloc.start()
+        states = []
+        for backtester in backtesters:
+            backtester.reset()
+            state = backtester.get_next_market_state()
+            while state is not None:
+                states.append(state)
+                state = backtester.get_next_market_state()
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {'states': len(states), 'replay_s': elapsed / 1e9, 'states_mb': memory / 2 ** 20}
+
+
+def benchmark_codec(trader_path: str, product_counts=(2, 6, 10), memory_lengths=(20, 50, 100),
+                    repeats: int = 200) -> List[Dict[str, float]]:
+    """
+    traderData size and encode plus decode time of a trader's TraderDataCodec
+    for price memories of a range of sizes, filled with half-tick random walks.
+    """
+    # The trader file is not registered in sys.modules, reach its classes through Trader
+    namespace = load_trader_class(trader_path).__init__.__globals__
+    random = np.random.default_rng(0)
+    rows = []
+    for count in product_counts:
+        for length in memory_lengths:
+            memories = {}
+            for i in range(count):
+                memory = namespace['PriceMemory'](length, 0.2)
+                for price in 5000 + np.cumsum(random.integers(-2, 3, 3 * length)) / 2:
+                    memory.append(float(price))
+                memories[f'PRODUCT_{i}'] = memory
+            for compress in (False, True):
+                codec = namespace['TraderDataCodec'](max_size=1 << 30, compress_over=0 if compress else 1 << 30)
+                start = perf_counter_ns()
+                for _ in range(repeats):
+                    codec.decode(codec.encode(memories), memories)
+                elapsed = (perf_counter_ns() - start) / repeats / 1000
+                rows.append({'products': count, 'memory_length': length, 'zlib': compress,
+                             'bytes': len(codec.encode(memories)), 'us': elapsed})
+    return rows
+
+
+def two_pass_flush(logger, state, orders, conversions, trader_data):
+    """Logger.flush as it was: encode everything once to size it, then again truncated."""
+    encoder_class = type(logger).__init__.__globals__['ProsperityEncoder']
+
+    def to_json(value):
+        return json.dumps(value, cls=encoder_class, separators=(",", ":"))
+
+    base_length = len(to_json([
+        logger.compress_state(state, ""), logger.compress_orders(orders), conversions, "", ""]))
+    max_item_length = (logger.max_log_length - base_length) // 3
+    print(to_json([
+        logger.compress_state(state, logger.truncate(state.traderData, max_item_length)),
+        logger.compress_orders(orders),
+        conversions,
+        logger.truncate(trader_data, max_item_length),
+        logger.truncate(logger.logs, max_item_length),
+    ]))
+    logger.logs = ""
+
+
+def benchmark_flush(trader_path: str = 'tutorial/tutorial.py', paths: List[str] = FLUSH_PATHS,
+                    max_ticks: int = 2000) -> Dict[str, Dict[str, float]]:
+    """
+    Per-tick cost of the tutorial Logger.flush against the old two-pass version,
+    flushing a quote on both sides of every product and up to a few thousand
+    characters of logs and traderData per tick. Raises if the two ever print different output.
+    """
+    logger_class = load_trader_class(trader_path).__init__.__globals__['Logger']
+    backtester = Backtester(load_prices(*paths, day=0))
+    flushes = {'flush': lambda logger, *args: logger.flush(*args), 'two_pass_flush': two_pass_flush}
+    timings = {name: [] for name in flushes}
+    logger = logger_class()
+
+    state = backtester.get_next_market_state()
+    while state is not None and backtester.current_tick < max_ticks:
+        orders = {}
+        for product, depth in state.order_depths.items():
+            orders[product] = [Round2.backtester.Order(product, max(depth.buy_orders), 1),
+                               Round2.backtester.Order(product, min(depth.sell_orders), -1)]
+        # Long enough to be truncated on some ticks, with characters that need escaping
+        trader_data = ('price "memory" \\ é ' * 200)[:state.timestamp % 2500]
+        outputs = []
+        for name, flush in flushes.items():
+            logger.print('Observations: "' + str(state.observations) + '"', state.timestamp)
+            logger.print(*orders.items())
+            state.traderData = trader_data[:300]
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                start = perf_counter_ns()
+                flush(logger, state, orders, 1, trader_data)
+                timings[name].append(perf_counter_ns() - start)
+            outputs.append(output.getvalue())
+        if outputs[0] != outputs[1]:
+            raise AssertionError(f'flush output differs at timestamp {state.timestamp}')
+        backtester.execute_orders(orders)
+        state = backtester.get_next_market_state()
+
+    return {name: summarize(samples) for name, samples in timings.items()}
+
+
+def benchmark_timing(trader_path: str, paths: List[str], max_ticks: int = None,
+                     report_every: int = 100) -> Dict[str, Dict[str, float]]:
+    """
+    Per-tick latency of a Trader with and without enable_timing, its summaries
+    printed through the tutorial Logger and flushed every tick. Raises if a
+    flushed line goes over the Logger's limit.
+    """
+    trader_class = load_trader_class(trader_path)
+    logger = load_trader_class('tutorial/tutorial.py').__init__.__globals__['Logger']()
+    backtester = Backtester(load_prices(*paths, day=0))
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        plain_times = replay(backtester, trader_class(), max_ticks)
+
+    trader = trader_class()
+    trader.enable_timing(emit=logger.print, report_every=report_every)
+    timed_times = []
+    backtester.reset()
+    state = backtester.get_next_market_state()
+    while state is not None and len(timed_times) != max_ticks:
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            start = perf_counter_ns()
+            results, conversions, traderData = trader.run(state)
+            timed_times.append(perf_counter_ns() - start)
+            output.seek(0)
+            output.truncate()
+            logger.flush(state, results, conversions, traderData)
+        if len(output.getvalue()) - 1 > logger.max_log_length:
+            raise AssertionError(f'flushed {len(output.getvalue()) - 1} characters at timestamp {state.timestamp}')
+        backtester.execute_orders(results)
+        backtester.trader_data = traderData
+        state = backtester.get_next_market_state()
+
+    print(trader.timer.summary())
+    return {'run': summarize(plain_times), 'run with enable_timing': summarize(timed_times)}
+
+
+def jsonpickle_str(observation) -> str:
+    """Observation.__str__ of the original datamodel."""
+    encode = Round2.compact_datamodel.jsonpickle_encode
+    return ("(plainValueObservations: " + encode(observation.plainValueObservations) +
+            ", conversionObservations: " + encode(observation.conversionObservations) + ")")
+
+
+def benchmark_observations(paths=OBSERVATION_PATHS, max_ticks: int = 2000) -> Dict[str, Dict[str, float]]:
+    """
+    str(state.observations) as every round's run() prints it, jsonpickle against
+    the compact datamodel's formatter. Raises if the two ever differ.
+    """
+    prices_path, observations_path = paths
+    backtester = Backtester(load_prices(prices_path), observations=load_observations(observations_path))
+    formatters = {'jsonpickle': jsonpickle_str, 'observation_json': str}
+    timings = {name: [] for name in formatters}
+    state = backtester.get_next_market_state()
+    while state is not None and backtester.current_tick < max_ticks:
+        outputs = []
+        for name, formatter in formatters.items():
+            start = perf_counter_ns()
+            outputs.append(formatter(state.observations))
+            timings[name].append(perf_counter_ns() - start)
+        if outputs[0] != outputs[1]:
+            raise AssertionError(f'observations formatted differently at timestamp {state.timestamp}')
+        state = backtester.get_next_market_state()
+    return {name: summarize(samples) for name, samples in timings.items()}
+
+
+def benchmark_state_codec(max_ticks: int = 3000) -> Dict[str, Dict[str, float]]:
+    """
+    TradingState.toJSON against state_codec on the states the Round 4 Trader
+    sees, market and own trades included. Raises if encode_state ever differs
+    from toJSON or decode_state does not give back the state it was handed.
+    """
+    trader_path, paths = ROUNDS['Round4']
+    trader = load_trader_class(trader_path)()
+    backtester = Backtester(load_prices(*paths, day=0), trades=load_trades(ROUND4_TRADES, day=0))
+    timings = {name: [] for name in ('toJSON', 'encode_state', 'decode_state')}
+
+    state = backtester.get_next_market_state()
+    while state is not None and backtester.current_tick < max_ticks:
+        start = perf_counter_ns()
+        expected = state.toJSON()
+        timings['toJSON'].append(perf_counter_ns() - start)
+        start = perf_counter_ns()
+        encoded = encode_state(state)
+        timings['encode_state'].append(perf_counter_ns() - start)
+        start = perf_counter_ns()
+        decoded = decode_state(encoded)
+        timings['decode_state'].append(perf_counter_ns() - start)
+        if encoded != expected or decoded.toJSON() != expected:
+            raise AssertionError(f'state round trip differs at timestamp {state.timestamp}')
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            results, conversions, traderData = trader.run(state)
+        backtester.execute_orders(results)
+        backtester.trader_data = traderData
+        state = backtester.get_next_market_state()
+    return {name: summarize(samples) for name, samples in timings.items()}
+
+
+def find_regressions(results, baseline, threshold: float) -> List[str]:
+    """Entries whose p99 grew by more than threshold (0.25 = 25%) over the baseline."""
+    regressions = []
+    for round_name, report in results.items():
+        for label, stats in report.items():
+            previous = baseline.get(round_name, {}).get(label)
+            if previous and stats['p99'] > previous['p99'] * (1 + threshold):
+                regressions.append(
+                    f"{round_name} {label}: p99 {previous['p99']:.1f}us -> {stats['p99']:.1f}us")
+    return regressions
+
+
+def print_report(round_name: str, report: Dict[str, Dict[str, float]]):
+    print(f'{round_name}')
+    print(f"  {'':<52}{'count':>8}{'p50 us':>10}{'p99 us':>10}{'max us':>10}")
+    for label, stats in report.items():
+        print(f"  {label:<52}{stats['count']:>8}{stats['p50']:>10.1f}{stats['p99']:>10.1f}{stats['max']:>10.1f}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Per-tick latency of every round\'s Trader.run')
+    parser.add_argument('rounds', nargs='*', default=list(ROUNDS))
+    parser.add_argument('--ticks', type=int, default=None, help='stop each replay after this many ticks')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed relative p99 growth before a regression is reported')
+    parser.add_argument('--datamodel', action='store_true',
+                        help='compare the original and the __slots__ datamodel on a full Round 3 replay')
+    parser.add_argument('--codec', action='store_true',
+                        help='traderData size and encode/decode time against products and memory_length')
+    parser.add_argument('--flush', action='store_true',
+                        help='tutorial Logger.flush against the old two-pass version, eight products')
+    parser.add_argument('--observations', action='store_true',
+                        help='str(state.observations) through jsonpickle and the compact datamodel')
+    parser.add_argument('--state-codec', action='store_true',
+                        help='TradingState.toJSON against state_codec on Round 4 ticks, with the round trip checked')
+    parser.add_argument('--timing', action='store_true',
+                        help='Trader.run with and without enable_timing, summaries through the tutorial Logger')
+    args = parser.parse_args(argv)
+
+    if args.flush:
+        print_report('Logger.flush', benchmark_flush())
+        return 0
+
+    if args.observations:
+        print_report('str(state.observations)', benchmark_observations())
+        return 0
+
+    if args.state_codec:
+        print_report('TradingState JSON', benchmark_state_codec())
+        return 0
+
+    if args.timing:
+        for round_name in args.rounds:
+            if round_name in ('Round3', 'Round4', 'Round5'):
+                trader_path, paths = ROUNDS[round_name]
+                print_report(round_name, benchmark_timing(trader_path, paths, args.ticks))
+        return 0
+
+    if args.codec:
+        print(f"{'products':>8}{'length':>8}{'zlib':>6}{'bytes':>8}{'us':>8}")
+        for row in benchmark_codec(ROUNDS['Round3'][0]):
+            over = '  over budget' if row['us'] > CODEC_BUDGET_US else ''
+            print(f"{row['products']:>8}{row['memory_length']:>8}{str(row['zlib']):>6}"
+                  f"{row['bytes']:>8}{row['us']:>8.1f}{over}")
+        return 0
+
+    if args.datamodel:
+        print(f"{'':<20}{'states':>8}{'replay s':>10}{'states MB':>11}")
+        for name, module in DATAMODELS.items():
+            stats = benchmark_datamodel(module)
+            print(f"{name:<20}{stats['states']:>8}{stats['replay_s']:>10.2f}{stats['states_mb']:>11.1f}")
+        return 0
+
+    results = {}
+    for round_name in args.rounds:
+        trader_path, paths = ROUNDS[round_name]
+        results[round_name] = benchmark_round(trader_path, paths, args.ticks)
+        print_report(round_name, results[round_name])
+
+    if args.save:
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=2)
+        print('Saved baseline to', args.baseline)
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            regressions = find_regressions(results, json.load(file), args.threshold)
+        for regression in regressions:
+            print('REGRESSION', regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import json
+from typing import Dict, List
+from json import JSONEncoder
+
+# Drop-in replacement for datamodel.py using __slots__, for the backtester and
+# the log tools that build millions of these objects. The constructors and the
+# JSON produced by ProsperityEncoder and TradingState.toJSON are the same;
+# slots are declared in the order the attributes were assigned, so the keys of
+# to_dict come out in the same order as the original __dict__.
+#
+# jsonpickle takes longer to import than the rest of the module, so it is only
+# imported once an Observation holds something observation_json cannot format.
+
+Time = int
+Symbol = str
+Product = str
+Position = int
+UserId = str
+ObservationValue = int
+
+
+def to_dict(o) -> dict:
+    """Stand-in for o.__dict__ that also works for slotted objects."""
+    slots = getattr(type(o), '__slots__', None)
+    if slots is None:
+        return o.__dict__
+    return {name: getattr(o, name) for name in slots}
+
+
+def jsonpickle_encode(value) -> str:
+    import jsonpickle
+    return jsonpickle.encode(value)
+
+
+# jsonpickle's json backend calls json.dumps with its default settings
+_encode = JSONEncoder().encode
+PLAIN_TYPES = frozenset((str, int, float, bool, type(None)))
+
+
+def observation_json(observations: dict) -> str:
+    """
+    jsonpickle.encode of Observation's plainValueObservations or
+    conversionObservations, without jsonpickle for what those dicts hold in
+    practice: str keys and plain values or ConversionObservations, each of
+    them once. Anything else, numpy scalars included, still goes through jsonpickle.
+    """
+    if not observations:
+        return "{}"
+    plain = {}
+    seen = set()
+    for key, value in observations.items():
+        if type(key) is not str:
+            return jsonpickle_encode(observations)
+        if type(value) in PLAIN_TYPES:
+            plain[key] = value
+        elif type(value) is ConversionObservation and id(value) not in seen:
+            seen.add(id(value))
+            fields = {'py/object': CONVERSION_OBSERVATION}
+            for name in ConversionObservation.__slots__:
+                field = getattr(value, name)
+                if type(field) not in PLAIN_TYPES:
+                    return jsonpickle_encode(observations)
+                fields[name] = field
+            plain[key] = fields
+        else:
+            # Repeated objects become jsonpickle py/id references
+            return jsonpickle_encode(observations)
+    return _encode(plain)
+
+
+class Listing:
+    __slots__ = ('symbol', 'product', 'denomination')
+
+    def __init__(self, symbol: Symbol, product: Product, denomination: Product):
+        self.symbol = symbol
+        self.product = product
+        self.denomination = denomination
+
+
+class ConversionObservation:
+    __slots__ = ('bidPrice', 'askPrice', 'transportFees', 'exportTariff',
+                 'importTariff', 'sunlight', 'humidity')
+
+    def __init__(self, bidPrice: float, askPrice: float, transportFees: float, exportTariff: float, importTariff: float, sunlight: float, humidity: float):
+        self.bidPrice = bidPrice
+        self.askPrice = askPrice
+        self.transportFees = transportFees
+        self.exportTariff = exportTariff
+        self.importTariff = importTariff
+        self.sunlight = sunlight
+        self.humidity = humidity
+
+
+# What jsonpickle names the class in its "py/object" entries
+CONVERSION_OBSERVATION = f'{ConversionObservation.__module__}.{ConversionObservation.__qualname__}'
+
+
+class Observation:
+    __slots__ = ('plainValueObservations', 'conversionObservations')
+
+    def __init__(self, plainValueObservations: Dict[Product, ObservationValue], conversionObservations: Dict[Product, ConversionObservation]) -> None:
+        self.plainValueObservations = plainValueObservations
+        self.conversionObservations = conversionObservations
+
+    def __str__(self) -> str:
+        return "(plainValueObservations: " + observation_json(self.plainValueObservations) + ", conversionObservations: " + observation_json(self.conversionObservations) + ")"
+
+
+class Order:
+    __slots__ = ('symbol', 'price', 'quantity')
+
+    def __init__(self, symbol: Symbol, price: int, quantity: int) -> None:
+        self.symbol = symbol
+        self.price = price
+        self.quantity = quantity
+
+    def __str__(self) -> str:
+        return "(" + self.symbol + ", " + str(self.price) + ", " + str(self.quantity) + ")"
+
+    def __repr__(self) -> str:
+        return "(" + self.symbol + ", " + str(self.price) + ", " + str(self.quantity) + ")"
+
+
+class OrderDepth:
+    __slots__ = ('buy_orders', 'sell_orders')
+
+    def __init__(self):
+        self.buy_orders: Dict[int, int] = {}
+        self.sell_orders: Dict[int, int] = {}
+
+
+class Trade:
+    __slots__ = ('symbol', 'price', 'quantity', 'buyer', 'seller', 'timestamp')
+
+    def __init__(self, symbol: Symbol, price: int, quantity: int, buyer: UserId = None, seller: UserId = None, timestamp: int = 0) -> None:
+        self.symbol = symbol
+        self.price: int = price
+        self.quantity: int = quantity
+        self.buyer = buyer
+        self.seller = seller
+        self.timestamp = timestamp
+
+    def __str__(self) -> str:
+        return "(" + self.symbol + ", " + self.buyer + " << " + self.seller + ", " + str(self.price) + ", " + str(self.quantity) + ", " + str(self.timestamp) + ")"
+
+    def __repr__(self) -> str:
+        return "(" + self.symbol + ", " + self.buyer + " << " + self.seller + ", " + str(self.price) + ", " + str(self.quantity) + ", " + str(self.timestamp) + ")"
+
+
+class TradingState(object):
+    __slots__ = ('traderData', 'timestamp', 'listings', 'order_depths', 'own_trades',
+                 'market_trades', 'position', 'observations')
+
+    def __init__(self,
+                 traderData: str,
+                 timestamp: Time,
+                 listings: Dict[Symbol, Listing],
+                 order_depths: Dict[Symbol, OrderDepth],
+                 own_trades: Dict[Symbol, List[Trade]],
+                 market_trades: Dict[Symbol, List[Trade]],
+                 position: Dict[Product, Position],
+                 observations: Observation):
+        self.traderData = traderData
+        self.timestamp = timestamp
+        self.listings = listings
+        self.order_depths = order_depths
+        self.own_trades = own_trades
+        self.market_trades = market_trades
+        self.position = position
+        self.observations = observations
+
+    def toJSON(self):
+        return json.dumps(self, default=to_dict, sort_keys=True)
+
+
+class ProsperityEncoder(JSONEncoder):
+
+    def default(self, o):
+        return to_dict(o)
@@ -0,0 +1,198 @@
+import glob
+import os
+import re
+import sys
+import time
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+from Round2.data_cache import load_prices, load_table
+
+TAPE_PATTERN = 'Round5/Round5_Data_Analysis/trades_round_*_day_*_wn.csv'
+# Order books of the days the named tapes cover, by round
+PRICE_FILES = {
+    1: 'Round1/Round1_DataAnalysis/prices_round_1_day_{}.csv',
+    3: 'Round3/Round3_Data_Analysis/prices_round_3_day_{}.csv',
+    4: 'Round4/Round4_Data_Analysis/prices_round_4_day_{}.csv',
+}
+# Forward returns are measured this many ticks (of 100 timestamps) after each trade
+HORIZONS = (1, 10, 100, 1000)
+TICK = 100
+
+
+class FlowStats(NamedTuple):
+    """What one counterparty did in one symbol, over one day or all of them."""
+    trades: int
+    bought: int
+    sold: int
+    net_flow: int
+    average_price: float
+    # Mean forward return per horizon, weighted by signed quantity
+    flow_return: Tuple[float, ...]
+
+
+def tape_files(pattern: str = TAPE_PATTERN) -> List[Tuple[int, int, str]]:
+    """(round, day, path) of every named tape, in round and day order."""
+    files = []
+    for path in glob.glob(pattern):
+        match = re.search(r'round_(\d+)_day_(-?\d+)', os.path.basename(path))
+        files.append((int(match.group(1)), int(match.group(2)), path))
+    return sorted(files)
+
+
+def forward_returns(timestamps: np.ndarray, mid_times: np.ndarray, mids: np.ndarray,
+                    horizons=HORIZONS) -> np.ndarray:
+    """(trades, horizons) relative mid change from each trade to horizon ticks later, NaN past the end of the day."""
+    start = np.searchsorted(mid_times, timestamps, side='right') - 1
+    result = np.full((len(timestamps), len(horizons)), np.nan)
+    for column, horizon in enumerate(horizons):
+        later = np.searchsorted(mid_times, timestamps + horizon * TICK, side='right') - 1
+        inside = (start >= 0) & (timestamps + horizon * TICK <= mid_times[-1])
+        result[inside, column] = mids[later[inside]] / mids[start[inside]] - 1
+    return result
+
+
+class CounterpartyIndex:
+    """
+    Every fill of the named trade tapes, once from the buyer's and once from
+    the seller's side, as columnar arrays sorted by (trader, symbol, day,
+    timestamp). A trader's fills in a symbol are therefore one contiguous
+    slice, and so are those of each of its days; the slice bounds and the
+    FlowStats of both are worked out once when the index is built.
+
+    quantity is signed: positive for the buyer's fill, negative for the seller's.
+    """
+
+    def __init__(self, pattern: str = TAPE_PATTERN, horizons=HORIZONS):
+        self.horizons = tuple(horizons)
+        parts = []
+        for round_number, day, path in tape_files(pattern):
+            parts.append(self.read_tape(round_number, day, path))
+        tapes = pd.concat(parts, ignore_index=True)
+
+        traders = sorted(set(tapes['buyer']) | set(tapes['seller']))
+        symbols = sorted(set(tapes['symbol']))
+        self.traders = traders
+        self.symbols = symbols
+        self.days = sorted(set(tapes['day']))
+        trader_ids = {trader: i for i, trader in enumerate(traders)}
+        symbol_ids = {symbol: i for i, symbol in enumerate(symbols)}
+
+        buyer = tapes['buyer'].map(trader_ids).to_numpy()
+        seller = tapes['seller'].map(trader_ids).to_numpy()
+        trader = np.concatenate([buyer, seller])
+        counterparty = np.concatenate([seller, buyer])
+        quantity = tapes['quantity'].to_numpy(dtype=np.int64)
+
+        def both(values):
+            return np.concatenate([values, values])
+
+        symbol = both(tapes['symbol'].map(symbol_ids).to_numpy())
+        day = both(tapes['day'].to_numpy(dtype=np.int64))
+        timestamp = both(tapes['timestamp'].to_numpy(dtype=np.int64))
+        order = np.lexsort((timestamp, day, symbol, trader))
+
+        self.trader = trader[order].astype(np.int32)
+        self.counterparty = counterparty[order].astype(np.int32)
+        self.symbol = symbol[order].astype(np.int32)
+        self.day = day[order]
+        self.timestamp = timestamp[order]
+        self.quantity = np.concatenate([quantity, -quantity])[order]
+        self.price = both(tapes['price'].to_numpy(dtype=np.float64))[order]
+        self.returns = np.concatenate([both(tapes[f'return_{h}'].to_numpy()) for h in self.horizons]) \
+            .reshape(len(self.horizons), -1).T[order]
+
+        self.slices: Dict[tuple, Tuple[int, int]] = {}
+        self.stats: Dict[tuple, FlowStats] = {}
+        for key_arrays in ((self.trader, self.symbol), (self.trader, self.symbol, self.day)):
+            changes = np.flatnonzero(np.any([np.diff(a) != 0 for a in key_arrays], axis=0)) + 1
+            bounds = np.concatenate(([0], changes, [len(self.trader)])).tolist()
+            for start, end in zip(bounds, bounds[1:]):
+                key = (traders[key_arrays[0][start]], symbols[key_arrays[1][start]])
+                if len(key_arrays) == 3:
+                    key += (int(key_arrays[2][start]),)
+                self.slices[key] = (start, end)
+                self.stats[key] = self.flow_stats(start, end)
+
+    def read_tape(self, round_number: int, day: int, path: str) -> pd.DataFrame:
+        tape = load_table(path).to_frame()
+        tape['day'] = day
+        prices = load_prices(PRICE_FILES[round_number].format(day))
+        returns = np.full((len(tape), len(self.horizons)), np.nan)
+        for symbol, rows in tape.groupby('symbol').indices.items():
+            series = prices[symbol]
+            returns[rows] = forward_returns(tape['timestamp'].to_numpy()[rows],
+                                            np.asarray(series.timestamp), np.asarray(series.mid_price),
+                                            self.horizons)
+        for column, horizon in enumerate(self.horizons):
+            tape[f'return_{horizon}'] = returns[:, column]
+        return tape
+
+    def flow_stats(self, start: int, end: int) -> FlowStats:
+        quantity = self.quantity[start:end]
+        volume = np.abs(quantity)
+        returns = self.returns[start:end]
+        known = ~np.isnan(returns)
+        flow_return = tuple(
+            float(np.sum(quantity[known[:, h]] * returns[known[:, h], h]) / np.sum(volume[known[:, h]]))
+            if known[:, h].any() else float('nan')
+            for h in range(len(self.horizons)))
+        return FlowStats(
+            trades=end - start,
+            bought=int(quantity[quantity > 0].sum()),
+            sold=int(-quantity[quantity < 0].sum()),
+            net_flow=int(quantity.sum()),
+            average_price=float(np.sum(self.price[start:end] * volume) / volume.sum()),
+            flow_return=flow_return,
+        )
+
+    def fills(self, trader: str, symbol: str, day: int = None) -> Dict[str, np.ndarray]:
+        """Views of one trader's fills in a symbol, on one day or on all of them."""
+        key = (trader, symbol) if day is None else (trader, symbol, day)
+        start, end = self.slices.get(key, (0, 0))
+        return {
+            'day': self.day[start:end],
+            'timestamp': self.timestamp[start:end],
+            'counterparty': self.counterparty[start:end],
+            'quantity': self.quantity[start:end],
+            'price': self.price[start:end],
+            'returns': self.returns[start:end],
+        }
+
+    def flow_vs_return(self, trader: str, symbol: str, horizon: int, day: int = None) -> float:
+        """Correlation of a trader's signed fills in a symbol with the forward return horizon ticks later."""
+        fills = self.fills(trader, symbol, day)
+        returns = fills['returns'][:, self.horizons.index(horizon)]
+        known = ~np.isnan(returns)
+        if known.sum() < 2:
+            return float('nan')
+        return float(np.corrcoef(fills['quantity'][known], returns[known])[0, 1])
+
+    def summary(self, by_day: bool = False) -> pd.DataFrame:
+        rows = []
+        for key, stats in self.stats.items():
+            if (len(key) == 3) != by_day:
+                continue
+            row = dict(zip(('trader', 'symbol', 'day'), key))
+            row.update(stats._asdict())
+            row.update({f'flow_return_{h}': value for h, value in zip(self.horizons, row.pop('flow_return'))})
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    index = CounterpartyIndex()
+    print(f'indexed {len(index.trader) // 2} trades of {len(index.traders)} traders '
+          f'in {time.perf_counter() - start:.2f}s')
+    print(index.summary().sort_values(['symbol', 'trader']).to_string(index=False))
+
+    trader, symbol = (sys.argv[1:3] + ['Remy', 'STRAWBERRIES'][len(sys.argv[1:3]):])
+    start = time.perf_counter()
+    correlation = index.flow_vs_return(trader, symbol, 1000)
+    stats = index.stats[(trader, symbol)]
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f'{trader} {symbol}: net flow {stats.net_flow}, correlation with the 1000 tick return '
+          f'{correlation:.3f} ({elapsed:.2f}ms)')
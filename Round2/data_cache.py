@@ -0,0 +1,233 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from Round2.market_data import OBSERVATION_COLUMNS, ROW_ARRAYS, ObservationData, PriceData, TradeTape
+from Round2.market_data import concat_prices, read_prices, tape_day
+
+CACHE_VERSION = 1
+CACHE_DIRECTORY = '.npy_cache'
+PRICE_SCHEMA = 'day;timestamp;product;bid_price_1'
+
+
+class CachedTable:
+    """Memory-mapped columns of a cached CSV file plus the categories of its string columns."""
+
+    def __init__(self, manifest: dict, columns: Dict[str, np.ndarray]):
+        self.manifest = manifest
+        self.columns = columns
+        self.categories: Dict[str, List[str]] = manifest['categories']
+
+    def __len__(self) -> int:
+        return self.manifest['rows']
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def decode(self, name: str) -> np.ndarray:
+        """Turn the codes of a string column back into its values."""
+        values = np.array(self.categories[name] + [''], dtype=object)
+        return values[self.columns[name]]
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            name: self.decode(name) if name in self.categories else column
+            for name, column in self.columns.items()})
+
+
+def cache_path(path: str) -> str:
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, CACHE_DIRECTORY, os.path.splitext(name)[0])
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_info(path: str) -> dict:
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def read_header(path: str) -> str:
+    with open(path) as file:
+        return file.readline().strip()
+
+
+def day_ranges(day: np.ndarray) -> Dict[str, List[int]]:
+    starts = np.flatnonzero(np.diff(day) != 0) + 1
+    bounds = np.concatenate(([0], starts, [len(day)])).tolist()
+    return {str(int(day[start])): [start, end] for start, end in zip(bounds, bounds[1:])}
+
+
+def convert_prices(path: str, directory: str) -> dict:
+    prices = read_prices(path)
+    for name in ROW_ARRAYS:
+        np.save(os.path.join(directory, name + '.npy'), getattr(prices, name))
+    return {
+        'kind': 'prices',
+        'rows': len(prices),
+        'columns': {name: [str(getattr(prices, name).dtype), list(getattr(prices, name).shape)]
+                    for name in ROW_ARRAYS},
+        'categories': {'product_ids': prices.products},
+        'products': prices.products,
+        'days': day_ranges(prices.day),
+    }
+
+
+def convert_table(path: str, directory: str) -> dict:
+    frame = pd.read_csv(path, sep=';')
+    columns = {}
+    categories = {}
+    for name in frame.columns:
+        column = frame[name]
+        if not pd.api.types.is_numeric_dtype(column) or column.isna().all():
+            # Missing names (the anonymised tapes) get the extra '' category
+            codes, uniques = pd.factorize(column, sort=True)
+            categories[name] = [str(value) for value in uniques]
+            codes[codes < 0] = len(uniques)
+            columns[name] = codes.astype(np.int32)
+        else:
+            columns[name] = column.to_numpy()
+        np.save(os.path.join(directory, name + '.npy'), columns[name])
+
+    if 'day' in columns or 'DAY' in columns:
+        days = day_ranges(columns.get('day', columns.get('DAY')))
+    else:
+        match = re.search(r'day_(-?\d+)', os.path.basename(path))
+        days = {match.group(1): [0, len(frame)]} if match else {}
+    products = categories.get('symbol', categories.get('product', []))
+
+    return {
+        'kind': 'table',
+        'rows': len(frame),
+        'columns': {name: [str(column.dtype), list(column.shape)] for name, column in columns.items()},
+        'categories': categories,
+        'products': products,
+        'days': days,
+    }
+
+
+def read_manifest(directory: str) -> dict:
+    try:
+        with open(os.path.join(directory, 'manifest.json')) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(directory: str, manifest: dict):
+    with open(os.path.join(directory, 'manifest.json'), 'w') as file:
+        json.dump(manifest, file, indent=2)
+
+
+def build_cache(path: str) -> dict:
+    """Convert one CSV file into its cache directory and return the new manifest."""
+    target = cache_path(path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    # Build next to the target and swap it in, so readers never see half a cache
+    staging = tempfile.mkdtemp(dir=os.path.dirname(target))
+    try:
+        if read_header(path).startswith(PRICE_SCHEMA):
+            manifest = convert_prices(path, staging)
+        else:
+            manifest = convert_table(path, staging)
+        manifest['version'] = CACHE_VERSION
+        manifest['schema'] = read_header(path)
+        manifest['source'] = dict(source_info(path), sha256=file_hash(path))
+        write_manifest(staging, manifest)
+        shutil.rmtree(target, ignore_errors=True)
+        os.rename(staging, target)
+    except OSError:
+        # Another process swapped in its own copy first
+        shutil.rmtree(staging, ignore_errors=True)
+        manifest = read_manifest(target)
+        if manifest is None:
+            raise
+    return manifest
+
+
+def ensure_cache(path: str) -> dict:
+    """Return the manifest of path's cache, rebuilding it when the CSV has changed."""
+    directory = cache_path(path)
+    manifest = read_manifest(directory)
+    if manifest is None or manifest.get('version') != CACHE_VERSION:
+        return build_cache(path)
+
+    info = source_info(path)
+    source = manifest['source']
+    if info['size'] == source['size'] and info['mtime_ns'] == source['mtime_ns']:
+        return manifest
+    if info['size'] == source['size'] and file_hash(path) == source['sha256']:
+        # Touched but unchanged, remember the new mtime so we skip hashing next time
+        source.update(info)
+        write_manifest(directory, manifest)
+        return manifest
+    return build_cache(path)
+
+
+def open_columns(path: str, manifest: dict) -> Dict[str, np.ndarray]:
+    directory = cache_path(path)
+    return {name: np.load(os.path.join(directory, name + '.npy'), mmap_mode='r')
+            for name in manifest['columns']}
+
+
+def load_table(path: str) -> CachedTable:
+    """Open the cached columns of any prices or trades CSV file."""
+    manifest = ensure_cache(path)
+    return CachedTable(manifest, open_columns(path, manifest))
+
+
+def load_prices(*paths: str, day: int = None) -> PriceData:
+    """Cached drop-in for market_data.read_prices; a single file is used without copying."""
+    parts = []
+    for path in paths:
+        manifest = ensure_cache(path)
+        if manifest['kind'] != 'prices':
+            raise ValueError(f'{path} is not an order book prices file')
+        parts.append(PriceData(products=manifest['products'],
+                               **open_columns(path, manifest)))
+    if len(parts) == 1 and day is None:
+        return parts[0]
+    return concat_prices(parts, day=day)
+
+
+def load_observations(*paths: str) -> ObservationData:
+    """Cached drop-in for market_data.read_observations."""
+    tables = [load_table(path) for path in paths]
+    return ObservationData(
+        np.concatenate([table['DAY'] for table in tables]),
+        np.concatenate([table['timestamp'] for table in tables]),
+        {name: np.concatenate([table[name] for table in tables]) for name in OBSERVATION_COLUMNS})
+
+
+def load_trades(*paths: str, day: int = None) -> TradeTape:
+    """Cached drop-in for market_data.read_trades."""
+    tables = [load_table(path) for path in paths]
+    return TradeTape(
+        np.concatenate([np.full(len(table), tape_day(path) if day is None else day)
+                        for path, table in zip(paths, tables)]),
+        *(np.concatenate([table.decode(name) if name in table.categories else table[name] for table in tables])
+          for name in ('timestamp', 'symbol', 'price', 'quantity', 'buyer', 'seller')))
+
+
+if __name__ == "__main__":
+    # Convert every prices and trades file below the given directories
+    for root in sys.argv[1:] or ['.']:
+        for path in sorted(glob.glob(os.path.join(root, '**', '*.csv'), recursive=True)):
+            if os.path.basename(path).startswith(('prices_', 'trades_')):
+                manifest = ensure_cache(path)
+                print(path, manifest['kind'], manifest['rows'], 'rows')
@@ -0,0 +1,55 @@
+import hashlib
+import json
+import os
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from Round2.data_cache import cache_path, ensure_cache, load_prices
+
+FEATURE_VERSION = 1
+
+
+def feature_path(path: str, manifest: dict, params: dict) -> str:
+    """Cache file of the features of one prices file, named after its hash and the feature parameters."""
+    key = json.dumps(dict(params, version=FEATURE_VERSION), sort_keys=True)
+    params_hash = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return os.path.join(cache_path(path), 'features',
+                        f"{manifest['source']['sha256'][:16]}_{params_hash}.npz")
+
+
+def compute_features(path: str, smoothing_factor: float) -> Dict[str, np.ndarray]:
+    prices = load_prices(path)
+    features = {}
+    for product in prices.products:
+        series = prices[product]
+        mid = np.asarray(series.mid_price, dtype=np.float64)
+        ema = pd.Series(mid).ewm(alpha=smoothing_factor, adjust=False).mean().to_numpy()
+        features[f'{product}/timestamp'] = np.asarray(series.timestamp)
+        features[f'{product}/mid'] = mid
+        features[f'{product}/ema'] = ema
+        features[f'{product}/spread'] = series.ask_prices[:, 0] - series.bid_prices[:, 0]
+    return features
+
+
+def day_features(path: str, smoothing_factor: float = 0.2) -> Dict[str, np.ndarray]:
+    """
+    Per product timestamps, mids, EMAs of the mid and bid-ask spreads of one
+    prices file, as '<product>/<feature>' arrays. They are worked out once and
+    kept next to the file's .npy cache, keyed by the file's hash and the
+    parameters, so reruns and overlapping walk-forward folds load them instead.
+    """
+    manifest = ensure_cache(path)
+    target = feature_path(path, manifest, {'smoothing_factor': smoothing_factor})
+    if os.path.exists(target):
+        with np.load(target) as cached:
+            return dict(cached)
+
+    features = compute_features(path, smoothing_factor)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    # Written under a temporary name and renamed, so a reader never sees half a file
+    staging = f'{target}.{os.getpid()}.npz'
+    np.savez(staging, **features)
+    os.replace(staging, target)
+    return features
@@ -0,0 +1,194 @@
+import json
+import sys
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from Round2.compact_datamodel import ConversionObservation, Listing, Observation, Order
+from Round2.compact_datamodel import OrderDepth, Symbol, Trade, TradingState
+from Round2.market_data import LEVELS
+
+SANDBOX = 'Sandbox logs:'
+ACTIVITIES = 'Activities log:'
+TRADES = 'Trade History:'
+SECTIONS = (SANDBOX, ACTIVITIES, TRADES)
+
+
+class SandboxEntry(NamedTuple):
+    timestamp: int
+    sandbox_log: str
+    lambda_log: str
+
+
+class ActivityRow(NamedTuple):
+    day: int
+    timestamp: int
+    product: str
+    bid_prices: Tuple[Optional[int], ...]
+    bid_volumes: Tuple[int, ...]
+    ask_prices: Tuple[Optional[int], ...]
+    ask_volumes: Tuple[int, ...]
+    mid_price: float
+    profit_and_loss: float
+
+
+class TradeRecord(NamedTuple):
+    timestamp: int
+    buyer: str
+    seller: str
+    symbol: str
+    currency: str
+    price: float
+    quantity: int
+
+
+class LambdaLog(NamedTuple):
+    """
+    One tick as written by Logger.flush: the state seen, what was returned and
+    the logs it was handed, plus whatever the Trader printed before the flush.
+    """
+    state: TradingState
+    orders: Dict[Symbol, List[Order]]
+    conversions: int
+    trader_data: str
+    logs: str
+    printed: str = ''
+
+
+Record = Union[SandboxEntry, ActivityRow, TradeRecord]
+
+
+def parse_number(text: str):
+    if not text:
+        return None
+    return float(text) if '.' in text else int(text)
+
+
+def parse_activity(line: str) -> ActivityRow:
+    fields = line.rstrip('\n').split(';')
+    levels = [parse_number(field) for field in fields[3:3 + 4 * LEVELS]]
+    bids = levels[:2 * LEVELS]
+    asks = levels[2 * LEVELS:]
+    return ActivityRow(
+        day=int(fields[0]),
+        timestamp=int(fields[1]),
+        product=fields[2],
+        bid_prices=tuple(bids[0::2]),
+        bid_volumes=tuple(volume or 0 for volume in bids[1::2]),
+        ask_prices=tuple(asks[0::2]),
+        ask_volumes=tuple(volume or 0 for volume in asks[1::2]),
+        mid_price=float(fields[3 + 4 * LEVELS]),
+        profit_and_loss=float(fields[4 + 4 * LEVELS]),
+    )
+
+
+def parse_log(path: str, sections=SECTIONS) -> Iterator[Record]:
+    """
+    Stream the records of a competition log file one line at a time.
+
+    Sandbox entries and trade history objects are pretty printed JSON, so each
+    object is collected from its opening to its closing brace line and decoded
+    on its own; the file is never held in memory. Lines of sections that are
+    not asked for are skipped without being parsed.
+    """
+    section = None
+    buffer: List[str] = []
+    with open(path) as file:
+        for line in file:
+            stripped = line.strip()
+            if stripped in SECTIONS:
+                section = stripped
+                buffer.clear()
+                continue
+            if section not in sections or not stripped:
+                continue
+
+            if section == ACTIVITIES:
+                if not stripped.startswith('day;'):
+                    yield parse_activity(stripped)
+            elif stripped == '{':
+                buffer = [stripped]
+            elif buffer:
+                buffer.append(stripped)
+                if stripped in ('}', '},'):
+                    entry = json.loads(''.join(buffer).rstrip(','))
+                    buffer = []
+                    if section == SANDBOX:
+                        yield SandboxEntry(entry['timestamp'], entry['sandboxLog'], entry['lambdaLog'])
+                    else:
+                        yield TradeRecord(**entry)
+
+
+def decode_order_depths(compressed: Dict[str, List[Dict[str, int]]]) -> Dict[Symbol, OrderDepth]:
+    order_depths = {}
+    for symbol, (buy_orders, sell_orders) in compressed.items():
+        order_depth = OrderDepth()
+        order_depth.buy_orders = {int(price): volume for price, volume in buy_orders.items()}
+        order_depth.sell_orders = {int(price): volume for price, volume in sell_orders.items()}
+        order_depths[symbol] = order_depth
+    return order_depths
+
+
+def decode_trades(compressed: List[List[Any]]) -> Dict[Symbol, List[Trade]]:
+    trades: Dict[Symbol, List[Trade]] = {}
+    for symbol, price, quantity, buyer, seller, timestamp in compressed:
+        trades.setdefault(symbol, []).append(
+            Trade(symbol, price, quantity, buyer, seller, timestamp))
+    return trades
+
+
+def decode_state(compressed: List[Any]) -> TradingState:
+    """Rebuild the TradingState that Logger.compress_state turned into lists."""
+    timestamp, trader_data, listings, order_depths, own_trades, market_trades, position, observations = compressed
+    plain_observations, conversion_observations = observations
+    return TradingState(
+        traderData=trader_data,
+        timestamp=timestamp,
+        listings={symbol: Listing(symbol, product, denomination)
+                  for symbol, product, denomination in listings},
+        order_depths=decode_order_depths(order_depths),
+        own_trades=decode_trades(own_trades),
+        market_trades=decode_trades(market_trades),
+        position=position,
+        observations=Observation(
+            plain_observations,
+            {product: ConversionObservation(*values)
+             for product, values in conversion_observations.items()}),
+    )
+
+
+def decode_lambda_log(lambda_log: str) -> Optional[LambdaLog]:
+    """
+    Decode a lambdaLog written by Logger.flush, or None for plain printed
+    output. The flush is the last line; lines printed before it are kept as
+    they are in printed.
+    """
+    printed, _, flushed = lambda_log.rstrip('\n').rpartition('\n')
+    if not flushed.startswith('['):
+        return None
+    try:
+        state, orders, conversions, trader_data, logs = json.loads(flushed)
+    except ValueError:
+        # Plain output that merely starts with a bracket, or a truncated payload
+        return None
+
+    decoded_orders: Dict[Symbol, List[Order]] = {}
+    for symbol, price, quantity in orders:
+        decoded_orders.setdefault(symbol, []).append(Order(symbol, price, quantity))
+    return LambdaLog(decode_state(state), decoded_orders, conversions, trader_data, logs,
+                     printed + '\n' if printed else '')
+
+
+def iter_lambda_logs(path: str) -> Iterator[LambdaLog]:
+    """Stream the decoded Logger.flush payloads of a log, skipping ticks that have none."""
+    for entry in parse_log(path, sections=(SANDBOX,)):
+        decoded = decode_lambda_log(entry.lambda_log)
+        if decoded is not None:
+            yield decoded
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        counts: Dict[str, int] = {}
+        for record in parse_log(path):
+            name = type(record).__name__
+            counts[name] = counts.get(name, 0) + 1
+        print(path, counts, sum(1 for _ in iter_lambda_logs(path)), 'decoded ticks')
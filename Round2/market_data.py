@@ -0,0 +1,219 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+
+LEVELS = 3
+
+
+class ProductSeries:
+    """Columnar price history of a single product."""
+
+    def __init__(self, product: str, rows: np.ndarray, day: np.ndarray, timestamp: np.ndarray,
+                 bid_prices: np.ndarray, bid_volumes: np.ndarray, ask_prices: np.ndarray,
+                 ask_volumes: np.ndarray, mid_price: np.ndarray):
+        self.product = product
+        # Row numbers of this product inside the parent PriceData
+        self.rows = rows
+        self.day = day
+        self.timestamp = timestamp
+        self.bid_prices = bid_prices
+        self.bid_volumes = bid_volumes
+        self.ask_prices = ask_prices
+        self.ask_volumes = ask_volumes
+        self.mid_price = mid_price
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+
+class PriceData:
+    """
+    The rows of one or more prices_round_*_day_*.csv files held as NumPy arrays.
+
+    Bid and ask levels are (rows, 3) arrays; missing levels have a NaN price and
+    a zero volume. Ask volumes are stored positive, as in the CSV.
+
+    Rows are ordered by (day, timestamp) and tick_starts holds the offset of the
+    first row of every tick plus a final end offset, so the rows of tick t are
+    tick_starts[t]:tick_starts[t + 1].
+    """
+
+    def __init__(self, products: List[str], product_ids: np.ndarray, day: np.ndarray, timestamp: np.ndarray,
+                 bid_prices: np.ndarray, bid_volumes: np.ndarray, ask_prices: np.ndarray,
+                 ask_volumes: np.ndarray, mid_price: np.ndarray):
+        self.products = products
+        self.product_index: Dict[str, int] = {
+            product: i for i, product in enumerate(products)}
+        self.product_ids = product_ids
+        self.day = day
+        self.timestamp = timestamp
+        self.bid_prices = bid_prices
+        self.bid_volumes = bid_volumes
+        self.ask_prices = ask_prices
+        self.ask_volumes = ask_volumes
+        self.mid_price = mid_price
+
+        changes = np.flatnonzero(
+            (np.diff(day) != 0) | (np.diff(timestamp) != 0)) + 1
+        self.tick_starts = np.concatenate(([0], changes, [len(timestamp)]))
+
+        self.series: Dict[str, ProductSeries] = {}
+        for i, product in enumerate(products):
+            rows = np.flatnonzero(product_ids == i)
+            self.series[product] = ProductSeries(
+                product, rows, day[rows], timestamp[rows],
+                bid_prices[rows], bid_volumes[rows],
+                ask_prices[rows], ask_volumes[rows], mid_price[rows])
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def __getitem__(self, product: str) -> ProductSeries:
+        return self.series[product]
+
+    @property
+    def tick_count(self) -> int:
+        return len(self.tick_starts) - 1
+
+
+def read_prices(*paths: str, day: int = None) -> PriceData:
+    """
+    Parse one or more semicolon separated price files into a single PriceData.
+
+    Passing day relabels every row with that day, which lets files of different
+    rounds be merged into one trading day with all of their products.
+    """
+    frame = pd.concat([pd.read_csv(path, sep=';') for path in paths],
+                      ignore_index=True)
+    if day is not None:
+        frame['day'] = day
+    return prices_from_frame(frame)
+
+
+def prices_from_frame(frame: pd.DataFrame) -> PriceData:
+    """Convert an already loaded prices DataFrame into a PriceData."""
+    frame = frame.sort_values(['day', 'timestamp'], kind='stable')
+    codes, uniques = pd.factorize(frame['product'], sort=True)
+
+    def levels(side: str, field: str) -> np.ndarray:
+        columns = [f'{side}_{field}_{level}' for level in range(1, LEVELS + 1)]
+        return frame[columns].to_numpy(dtype=np.float64)
+
+    return PriceData(
+        products=list(uniques),
+        product_ids=codes.astype(np.int32),
+        day=frame['day'].to_numpy(dtype=np.int64),
+        timestamp=frame['timestamp'].to_numpy(dtype=np.int64),
+        bid_prices=levels('bid', 'price'),
+        bid_volumes=np.nan_to_num(levels('bid', 'volume')).astype(np.int64),
+        ask_prices=levels('ask', 'price'),
+        ask_volumes=np.nan_to_num(levels('ask', 'volume')).astype(np.int64),
+        mid_price=frame['mid_price'].to_numpy(dtype=np.float64),
+    )
+
+
+# Array attributes of PriceData holding one entry per row
+ROW_ARRAYS = ('product_ids', 'day', 'timestamp', 'bid_prices', 'bid_volumes',
+              'ask_prices', 'ask_volumes', 'mid_price')
+
+
+def concat_prices(parts: List[PriceData], day: int = None) -> PriceData:
+    """Merge several PriceData into one, optionally relabelling every row with day."""
+    products = sorted(set().union(*(part.products for part in parts)))
+    index = {product: i for i, product in enumerate(products)}
+
+    columns = {name: np.concatenate([getattr(part, name) for part in parts])
+               for name in ROW_ARRAYS if name != 'product_ids'}
+    columns['product_ids'] = np.concatenate([
+        np.array([index[product] for product in part.products],
+                 dtype=np.int32)[part.product_ids]
+        for part in parts])
+    if day is not None:
+        columns['day'] = np.full_like(columns['day'], day)
+
+    order = np.lexsort((columns['timestamp'], columns['day']))
+    return PriceData(products=products, **{name: column[order] for name, column in columns.items()})
+
+
+# Columns of the prices_round_2_day_*.csv observation files, besides DAY and timestamp
+OBSERVATION_COLUMNS = ('ORCHIDS', 'TRANSPORT_FEES', 'EXPORT_TARIFF', 'IMPORT_TARIFF', 'SUNLIGHT', 'HUMIDITY')
+
+
+class ObservationData:
+    """
+    The ORCHIDS price in the south and the conditions of every timestamp of
+    one or more prices_round_2_day_*.csv files, sorted by (day, timestamp).
+    """
+
+    def __init__(self, day: np.ndarray, timestamp: np.ndarray, columns: Dict[str, np.ndarray]):
+        order = np.lexsort((timestamp, day))
+        self.day = np.asarray(day)[order]
+        self.timestamp = np.asarray(timestamp)[order]
+        self.columns = {name: np.asarray(column, dtype=np.float64)[order]
+                        for name, column in columns.items()}
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def rows_of(self, day: np.ndarray, timestamp: np.ndarray) -> np.ndarray:
+        """Row of the observation taken at each (day, timestamp), -1 where there is none."""
+        keys = self.day.astype(np.int64) * 10_000_000 + self.timestamp
+        wanted = np.asarray(day, dtype=np.int64) * 10_000_000 + np.asarray(timestamp)
+        rows = np.minimum(np.searchsorted(keys, wanted), max(len(keys) - 1, 0))
+        found = len(keys) > 0 and keys[rows] == wanted
+        return np.where(found, rows, -1)
+
+
+def read_observations(*paths: str) -> ObservationData:
+    frame = pd.concat([pd.read_csv(path, sep=';') for path in paths], ignore_index=True)
+    return ObservationData(
+        frame['DAY'].to_numpy(dtype=np.int64),
+        frame['timestamp'].to_numpy(dtype=np.int64),
+        {name: frame[name].to_numpy() for name in OBSERVATION_COLUMNS})
+
+
+class TradeTape:
+    """Market trades of one or more trades_round_*_day_*.csv files, sorted by (day, timestamp)."""
+
+    def __init__(self, day: np.ndarray, timestamp: np.ndarray, symbol: np.ndarray, price: np.ndarray,
+                 quantity: np.ndarray, buyer: np.ndarray, seller: np.ndarray):
+        order = np.lexsort((timestamp, day))
+        self.day = np.asarray(day, dtype=np.int64)[order]
+        self.timestamp = np.asarray(timestamp, dtype=np.int64)[order]
+        self.symbol = np.asarray(symbol, dtype=object)[order]
+        self.price = np.asarray(price, dtype=np.float64)[order]
+        self.quantity = np.asarray(quantity, dtype=np.int64)[order]
+        # Empty strings on the anonymised tapes
+        self.buyer = np.asarray(buyer, dtype=object)[order]
+        self.seller = np.asarray(seller, dtype=object)[order]
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+
+def tape_day(path: str) -> int:
+    """Day of a trades file, which is only given by its name."""
+    match = re.search(r'day_(-?\d+)', os.path.basename(path))
+    if match is None:
+        raise ValueError(f'cannot tell the day of {path}')
+    return int(match.group(1))
+
+
+def read_trades(*paths: str, day: int = None) -> TradeTape:
+    """Parse trades files, relabelling every row with day when given, as read_prices does."""
+    frames = []
+    for path in paths:
+        frame = pd.read_csv(path, sep=';')
+        frame['day'] = tape_day(path) if day is None else day
+        frames.append(frame)
+    frame = pd.concat(frames, ignore_index=True)
+    return TradeTape(
+        frame['day'].to_numpy(), frame['timestamp'].to_numpy(), frame['symbol'].to_numpy(dtype=object),
+        frame['price'].to_numpy(), frame['quantity'].to_numpy(),
+        frame['buyer'].fillna('').to_numpy(dtype=object), frame['seller'].fillna('').to_numpy(dtype=object))
@@ -0,0 +1,172 @@
+import sys
+import time
+from typing import Dict, NamedTuple
+
+import numpy as np
+
+from Round2.data_cache import load_prices
+
+# COCONUT_COUPON is a call on COCONUT struck at 10000 with 250 days to expiry at
+# the start of the first Round 4 day, the same figures Round4/trader.py uses
+STRIKE = 10000
+DAYS_TO_EXPIRY = 250
+DAYS_PER_YEAR = 365
+TIMESTAMPS_PER_DAY = 1_000_000
+R4 = 'Round4/Round4_Data_Analysis/prices_round_4_day_{}.csv'
+ROUND4_DAYS = (1, 2, 3)
+
+# Hart's rational approximation of the normal tail, accurate to double precision
+TAIL_NUMERATOR = (3.52624965998911e-02, 0.700383064443688, 6.37396220353165, 33.912866078383,
+                  112.079291497871, 221.213596169931, 220.206867912376)
+TAIL_DENOMINATOR = (8.83883476483184e-02, 1.75566716318264, 16.064177579207, 86.7807322029461,
+                    296.564248779674, 637.333633378831, 793.826512519948, 440.413735824752)
+SQRT_2PI = np.sqrt(2 * np.pi)
+
+
+class Greeks(NamedTuple):
+    price: np.ndarray
+    delta: np.ndarray
+    gamma: np.ndarray
+    vega: np.ndarray
+
+
+class CouponHistory(NamedTuple):
+    """COCONUT and COCONUT_COUPON mids side by side, one entry per tick."""
+    day: np.ndarray
+    timestamp: np.ndarray
+    spot: np.ndarray
+    coupon: np.ndarray
+    expiry: np.ndarray
+
+
+def norm_pdf(x):
+    x = np.asarray(x, dtype=np.float64)
+    return np.exp(-0.5 * x * x) / SQRT_2PI
+
+
+def norm_cdf(x):
+    """Standard normal CDF of an array, without needing scipy."""
+    x = np.asarray(x, dtype=np.float64)
+    z = np.abs(x)
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        numerator = np.polyval(TAIL_NUMERATOR, z)
+        denominator = np.polyval(TAIL_DENOMINATOR, z)
+        near = np.exp(-0.5 * z * z) * numerator / denominator
+        # Continued fraction further out, where the polynomials lose accuracy
+        fraction = z + 0.65
+        for k in (4, 3, 2, 1):
+            fraction = z + k / fraction
+        far = np.exp(-0.5 * z * z) / fraction / SQRT_2PI
+    tail = np.where(z < 7.07106781186547, near, np.where(z < 37, far, 0.0))
+    return np.where(x > 0, 1 - tail, tail)
+
+
+def black_scholes(S, K, T, r, sigma) -> Greeks:
+    """European call price, delta, gamma and vega for arrays (or scalars) of inputs."""
+    S, K, T, r, sigma = np.broadcast_arrays(*(np.asarray(a, dtype=np.float64) for a in (S, K, T, r, sigma)))
+    root_t = np.sqrt(T)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * root_t)
+    d2 = d1 - sigma * root_t
+    pdf = norm_pdf(d1)
+    cdf = norm_cdf(d1)
+    return Greeks(
+        price=S * cdf - K * np.exp(-r * T) * norm_cdf(d2),
+        delta=cdf,
+        gamma=pdf / (S * sigma * root_t),
+        vega=S * pdf * root_t,
+    )
+
+
+def implied_volatility(price, S, K, T, r=0.0, low: float = 1e-4, high: float = 5.0,
+                       tolerance: float = 1e-10, max_iterations: int = 100) -> np.ndarray:
+    """
+    Volatility that reprices each call, solved for all of them at once.
+
+    Every element keeps a [low, high] bracket that is narrowed on each step;
+    the Newton step is taken when it stays inside the bracket and a bisection
+    step otherwise, so flat vega far from the money cannot throw it off.
+    Prices outside the no-arbitrage bounds, or not bracketed by low and high,
+    come back as NaN. The result has the broadcast shape of the inputs, a
+    float for scalars.
+    """
+    price, S, K, T, r = np.broadcast_arrays(*(np.asarray(a, dtype=np.float64) for a in (price, S, K, T, r)))
+    shape = price.shape
+    # Solved on flat copies, as the bookkeeping below indexes by position
+    price, S, K, T, r = (np.atleast_1d(a).ravel() for a in (price, S, K, T, r))
+    lower = black_scholes(S, K, T, r, low).price
+    upper = black_scholes(S, K, T, r, high).price
+    valid = (price >= lower) & (price <= upper) & np.isfinite(price)
+
+    low = np.full(price.shape, low)
+    high = np.full(price.shape, high)
+    sigma = np.where(valid, 0.5 * (low + high), np.nan)
+    # Start from the Brenner-Subrahmanyam at-the-money estimate where it is inside the bracket
+    guess = price / S * np.sqrt(2 * np.pi / T)
+    sigma = np.where(valid & (guess > low) & (guess < high), guess, sigma)
+
+    active = valid.copy()
+    for _ in range(max_iterations):
+        if not active.any():
+            break
+        greeks = black_scholes(S[active], K[active], T[active], r[active], sigma[active])
+        error = greeks.price - price[active]
+        s = sigma[active]
+        lo = np.where(error < 0, s, low[active])
+        hi = np.where(error > 0, s, high[active])
+        with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+            newton = s - error / greeks.vega
+        step = np.where((newton > lo) & (newton < hi), newton, 0.5 * (lo + hi))
+
+        low[active], high[active] = lo, hi
+        sigma[active] = step
+        done = (np.abs(error) < tolerance) | (hi - lo < tolerance)
+        sigma[np.flatnonzero(active)[done]] = s[done]
+        active[np.flatnonzero(active)[done]] = False
+    return sigma.reshape(shape) if shape else float(sigma[0])
+
+
+def time_to_expiry(day, timestamp, days_to_expiry: float = DAYS_TO_EXPIRY,
+                   first_day: int = ROUND4_DAYS[0]) -> np.ndarray:
+    """Years left on the coupon at each (day, timestamp) of the Round 4 data."""
+    elapsed = np.asarray(day) - first_day + np.asarray(timestamp) / TIMESTAMPS_PER_DAY
+    return (days_to_expiry - elapsed) / DAYS_PER_YEAR
+
+
+def coupon_history(days=ROUND4_DAYS) -> CouponHistory:
+    prices = load_prices(*(R4.format(day) for day in days))
+    coconut = prices['COCONUT']
+    coupon = prices['COCONUT_COUPON']
+    if not (np.array_equal(coconut.day, coupon.day) and np.array_equal(coconut.timestamp, coupon.timestamp)):
+        raise ValueError('COCONUT and COCONUT_COUPON are not quoted on the same ticks')
+    return CouponHistory(
+        day=np.asarray(coconut.day),
+        timestamp=np.asarray(coconut.timestamp),
+        spot=np.asarray(coconut.mid_price),
+        coupon=np.asarray(coupon.mid_price),
+        expiry=time_to_expiry(coconut.day, coconut.timestamp),
+    )
+
+
+def calibrate_sigma(history: CouponHistory, strike: float = STRIKE, r: float = 0.0) -> Dict[str, np.ndarray]:
+    """Implied volatility of every tick, and the greeks at the median volatility of the whole history."""
+    implied = implied_volatility(history.coupon, history.spot, strike, history.expiry, r)
+    sigma = float(np.nanmedian(implied))
+    greeks = black_scholes(history.spot, strike, history.expiry, r, sigma)
+    return {'implied_volatility': implied, 'sigma': sigma, **greeks._asdict()}
+
+
+if __name__ == "__main__":
+    days = [int(day) for day in sys.argv[1:]] or list(ROUND4_DAYS)
+    history = coupon_history(days)
+    start = time.perf_counter()
+    calibration = calibrate_sigma(history)
+    elapsed = time.perf_counter() - start
+
+    implied = calibration['implied_volatility']
+    for day in days:
+        on_day = implied[history.day == day]
+        print(f'day {day}: implied volatility mean {np.nanmean(on_day):.5f} median {np.nanmedian(on_day):.5f} '
+              f'std {np.nanstd(on_day):.5f} unsolved {int(np.isnan(on_day).sum())}')
+    fair = calibration['price']
+    print(f"sigma {calibration['sigma']:.5f} over {len(implied)} ticks, solved in {elapsed:.3f}s")
+    print(f'coupon minus fair value: mean {np.mean(history.coupon - fair):.2f} std {np.std(history.coupon - fair):.2f}')
@@ -0,0 +1,129 @@
+import sys
+import time
+from collections.abc import Mapping
+from typing import Dict, Iterator
+
+import numpy as np
+
+from Round2.data_cache import load_prices
+from Round2.market_data import LEVELS, PriceData
+
+# Index of the last two axes of BookTensor.book
+PRICE, VOLUME = 0, 1
+BID, ASK = 0, 1
+
+
+class LevelsView(Mapping):
+    """
+    One side of one product's book on one tick as a read-only {price: volume}
+    mapping, read straight from the tensor. Prices come out as ints in the
+    tensor's level order (best first) and, as in OrderDepth, ask volumes negative.
+    """
+    __slots__ = ('levels', 'sign')
+
+    def __init__(self, levels: np.ndarray, sign: int):
+        # (LEVELS, 2) view of the tensor: price and volume of each level
+        self.levels = levels
+        self.sign = sign
+
+    def items(self):
+        return [(int(price), self.sign * int(volume)) for price, volume in self.levels.tolist() if volume]
+
+    def __getitem__(self, price: int) -> int:
+        for level_price, volume in self.levels.tolist():
+            if volume and level_price == price:
+                return self.sign * int(volume)
+        raise KeyError(price)
+
+    def __iter__(self) -> Iterator[int]:
+        return (int(price) for price, volume in self.levels.tolist() if volume)
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.levels[:, VOLUME]))
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+
+class DepthView:
+    """Stands in for an OrderDepth wherever it is only read: buy_orders and sell_orders are LevelsViews."""
+    __slots__ = ('buy_orders', 'sell_orders')
+
+    def __init__(self, book: np.ndarray):
+        # (LEVELS, 2, 2) view of one product on one tick
+        self.buy_orders = LevelsView(book[:, :, BID], 1)
+        self.sell_orders = LevelsView(book[:, :, ASK], -1)
+
+
+class BookTensor:
+    """
+    Every tick's order books of a PriceData in one dense array,
+
+        book[tick, product, level, PRICE or VOLUME, BID or ASK]
+
+    with products in PriceData.products order. Missing levels, and products
+    not quoted on a tick at all, have a NaN price and a zero volume; quoted
+    tells the latter apart. Volumes are positive on both sides, as in the CSV.
+    """
+
+    def __init__(self, prices: PriceData):
+        self.products = list(prices.products)
+        self.product_index = dict(prices.product_index)
+        first_rows = prices.tick_starts[:-1]
+        self.day = np.asarray(prices.day)[first_rows]
+        self.timestamp = np.asarray(prices.timestamp)[first_rows]
+
+        ticks = np.repeat(np.arange(prices.tick_count), np.diff(prices.tick_starts))
+        product_ids = np.asarray(prices.product_ids)
+        self.book = np.full((prices.tick_count, len(self.products), LEVELS, 2, 2), np.nan)
+        self.book[..., VOLUME, :] = 0
+        for side, level_prices, volumes in ((BID, prices.bid_prices, prices.bid_volumes),
+                                            (ASK, prices.ask_prices, prices.ask_volumes)):
+            self.book[ticks, product_ids, :, PRICE, side] = level_prices
+            self.book[ticks, product_ids, :, VOLUME, side] = volumes
+        self.quoted = np.zeros((prices.tick_count, len(self.products)), dtype=bool)
+        self.quoted[ticks, product_ids] = True
+
+    def __len__(self) -> int:
+        return len(self.book)
+
+    def best(self, side: int) -> np.ndarray:
+        """(ticks, products) view of the best price on one side, NaN where it is empty."""
+        return self.book[:, :, 0, PRICE, side]
+
+    def mid_prices(self) -> np.ndarray:
+        """(ticks, products) mid of the best bid and ask, NaN where either side is empty."""
+        return (self.best(BID) + self.best(ASK)) / 2
+
+    def depth(self, tick: int, product: str) -> DepthView:
+        return DepthView(self.book[tick, self.product_index[product]])
+
+    def order_depths(self, tick: int) -> Dict[str, DepthView]:
+        """The order_depths of a TradingState for this tick, as views of the tensor."""
+        return {product: DepthView(self.book[tick, i])
+                for i, product in enumerate(self.products) if self.quoted[tick, i]}
+
+
+if __name__ == "__main__":
+    from Round2.backtester import Backtester
+
+    paths = sys.argv[1:] or ['Round1/Round1_DataAnalysis/prices_round_1_day_-1.csv',
+                             'Round3/Round3_Data_Analysis/prices_round_3_day_1.csv',
+                             'Round4/Round4_Data_Analysis/prices_round_4_day_1.csv']
+    prices = load_prices(*paths, day=0)
+    start = time.perf_counter()
+    tensor = BookTensor(prices)
+    elapsed = time.perf_counter() - start
+    print(f'{tensor.book.shape} tensor, {tensor.book.nbytes / 1e6:.1f} MB, built in {elapsed * 1000:.0f}ms')
+
+    # The views have to read the same books the Backtester hands its Traders
+    backtester = Backtester(prices)
+    for tick in range(len(tensor)):
+        state = backtester.get_next_market_state()
+        views = tensor.order_depths(tick)
+        if views.keys() != state.order_depths.keys() or any(
+                dict(views[product].buy_orders.items()) != depth.buy_orders
+                or dict(views[product].sell_orders.items()) != depth.sell_orders
+                for product, depth in state.order_depths.items()):
+            raise AssertionError(f'views differ from the Backtester at tick {tick}')
+    print(f'views match the Backtester on all {len(tensor)} ticks')
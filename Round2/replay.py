@@ -0,0 +1,201 @@
+import contextlib
+import glob
+import io
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from Round2.backtester import load_trader_class
+from Round2.compact_datamodel import Observation, Order, OrderDepth, Symbol, Trade, TradingState
+from Round2.log_parser import ACTIVITIES, SANDBOX, TRADES, ActivityRow, SandboxEntry, decode_lambda_log, parse_log
+
+LOG_PATTERN = 'Round1/backtests/*.log'
+SUBMISSION = 'SUBMISSION'
+# What the exchange's listings carry, as Logger.flush wrote them out
+DENOMINATION = 1
+
+
+class Divergence(NamedTuple):
+    """The first tick on which the Trader did not do what the exchange recorded."""
+    timestamp: int
+    expected: str
+    actual: str
+
+
+class ReplayResult(NamedTuple):
+    path: str
+    ticks: int
+    divergence: Optional[Divergence]
+
+
+class ExchangeLog:
+    """
+    The ticks of one competition log, laid out so the TradingState of each can
+    be put together without parsing anything more: the books of the Activities
+    log, and the fills of the Trade History split into our own and the
+    market's. Fills are stamped with the tick they happened on and reach the
+    Trader on the next one. As in the logged states, each symbol keeps showing
+    its last fills until it has new ones.
+
+    The Trade History lists our fills once for every tick they are shown on,
+    so each is counted once before the positions are summed up.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.timestamps: List[int] = []
+        self.lambda_logs: List[str] = []
+        books: Dict[int, Dict[Symbol, Tuple[Dict[int, int], Dict[int, int]]]] = {}
+        fills: Dict[int, List[Trade]] = {}
+        own_fills: Dict[Symbol, Dict[int, List[Trade]]] = {}
+        for record in parse_log(path, sections=(SANDBOX, ACTIVITIES, TRADES)):
+            if isinstance(record, SandboxEntry):
+                self.timestamps.append(record.timestamp)
+                self.lambda_logs.append(record.lambda_log)
+            elif isinstance(record, ActivityRow):
+                books.setdefault(record.timestamp, {})[record.product] = (
+                    {price: volume for price, volume in zip(record.bid_prices, record.bid_volumes) if volume},
+                    {price: -volume for price, volume in zip(record.ask_prices, record.ask_volumes) if volume})
+            else:
+                trade = Trade(record.symbol, record.price, record.quantity, record.buyer, record.seller,
+                              record.timestamp)
+                if SUBMISSION in (record.buyer, record.seller):
+                    own_fills.setdefault(record.symbol, {}).setdefault(record.timestamp, []).append(trade)
+                else:
+                    fills.setdefault(record.timestamp, []).append(trade)
+        for timestamp, trades in self.unrepeated(own_fills).items():
+            fills.setdefault(timestamp, []).extend(trades)
+
+        self.books = [books.get(timestamp, {}) for timestamp in self.timestamps]
+        self.own_trades: List[Dict[Symbol, List[Trade]]] = []
+        self.market_trades: List[Dict[Symbol, List[Trade]]] = []
+        self.positions: List[Dict[Symbol, int]] = []
+        own: Dict[Symbol, List[Trade]] = {}
+        market: Dict[Symbol, List[Trade]] = {}
+        position: Dict[Symbol, int] = {}
+        previous = None
+        for timestamp in self.timestamps:
+            if previous is not None:
+                new_own: Dict[Symbol, List[Trade]] = {}
+                new_market: Dict[Symbol, List[Trade]] = {}
+                for trade in fills.get(previous, ()):
+                    if SUBMISSION in (trade.buyer, trade.seller):
+                        new_own.setdefault(trade.symbol, []).append(trade)
+                        sign = 1 if trade.buyer == SUBMISSION else -1
+                        position[trade.symbol] = position.get(trade.symbol, 0) + sign * trade.quantity
+                    else:
+                        new_market.setdefault(trade.symbol, []).append(trade)
+                own = {**own, **new_own}
+                market = {**market, **new_market}
+            self.own_trades.append(own)
+            self.market_trades.append(market)
+            self.positions.append(position.copy())
+            previous = timestamp
+
+    def unrepeated(self, own_fills: Dict[Symbol, Dict[int, List[Trade]]]) -> Dict[int, List[Trade]]:
+        """Our fills by timestamp, each once, from the repeated ones of the Trade History."""
+        index = {timestamp: i for i, timestamp in enumerate(self.timestamps)}
+        unique: Dict[int, List[Trade]] = {}
+        for by_timestamp in own_fills.values():
+            timestamps = sorted(by_timestamp)
+            for timestamp, shown_until in zip(timestamps, timestamps[1:] + [None]):
+                # Shown on every tick after it up to and including that of the symbol's next fills
+                end = len(self.timestamps) if shown_until is None else index[shown_until]
+                repeats = max(end - index[timestamp], 1)
+                trades = by_timestamp[timestamp]
+                counts = Counter((t.price, t.quantity, t.buyer, t.seller) for t in trades)
+                kept: Counter = Counter()
+                for trade in trades:
+                    key = (trade.price, trade.quantity, trade.buyer, trade.seller)
+                    if kept[key] < counts[key] // repeats:
+                        kept[key] += 1
+                        unique.setdefault(timestamp, []).append(trade)
+        return unique
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def state(self, i: int, trader_data: str) -> TradingState:
+        """A fresh TradingState of tick i, so nothing one tick's run changes leaks into the next."""
+        order_depths = {}
+        for symbol, (buy_orders, sell_orders) in self.books[i].items():
+            order_depth = order_depths[symbol] = OrderDepth()
+            order_depth.buy_orders = dict(buy_orders)
+            order_depth.sell_orders = dict(sell_orders)
+        return TradingState(
+            traderData=trader_data,
+            timestamp=self.timestamps[i],
+            # The exchange hands listings over as dicts, Logger.compress_listings subscripts them
+            listings={symbol: {'symbol': symbol, 'product': symbol, 'denomination': DENOMINATION}
+                      for symbol in order_depths},
+            order_depths=order_depths,
+            own_trades={symbol: list(trades) for symbol, trades in self.own_trades[i].items()},
+            market_trades={symbol: list(trades) for symbol, trades in self.market_trades[i].items()},
+            position=dict(self.positions[i]),
+            observations=Observation({}, {}),
+        )
+
+
+def flat_orders(orders: Dict[Symbol, List[Order]]) -> List[Tuple[Symbol, int, int]]:
+    return [(order.symbol, order.price, order.quantity) for symbol_orders in orders.values() for order in symbol_orders]
+
+
+def compare_tick(lambda_log: str, printed: str, orders, trader_data: str) -> Optional[Tuple[str, str]]:
+    """
+    (expected, actual) if a tick went differently, None if it matches. A
+    lambdaLog written by Logger.flush is checked against the orders and
+    traderData run returned, and what was printed before the flush against
+    what run printed before its own; plain printed output is checked as printed.
+    """
+    flushed = decode_lambda_log(lambda_log)
+    if flushed is not None:
+        expected = (flat_orders(flushed.orders), flushed.trader_data)
+        actual = (flat_orders(orders), trader_data)
+        if expected != actual:
+            return repr(expected), repr(actual)
+        before_flush = printed.rstrip('\n').rpartition('\n')[0]
+        before_flush = before_flush + '\n' if before_flush else ''
+        return None if before_flush == flushed.printed else (flushed.printed, before_flush)
+    printed = printed.rstrip('\n')
+    return None if printed == lambda_log else (lambda_log, printed)
+
+
+def replay_log(trader, log: ExchangeLog) -> ReplayResult:
+    """Feed the logged ticks to trader.run in order, stopping at the first that does not match."""
+    trader_data = ''
+    for i in range(len(log)):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            orders, conversions, trader_data = trader.run(log.state(i, trader_data))
+        mismatch = compare_tick(log.lambda_logs[i], output.getvalue(), orders, trader_data)
+        if mismatch is not None:
+            return ReplayResult(log.path, i, Divergence(log.timestamps[i], *mismatch))
+    return ReplayResult(log.path, len(log), None)
+
+
+def first_difference(expected: str, actual: str) -> Tuple[str, str]:
+    """The first line on which two outputs differ."""
+    expected_lines = expected.split('\n')
+    actual_lines = actual.split('\n')
+    for expected_line, actual_line in zip(expected_lines, actual_lines):
+        if expected_line != actual_line:
+            return expected_line, actual_line
+    length = min(len(expected_lines), len(actual_lines))
+    return '\n'.join(expected_lines[length:]) or '<end>', '\n'.join(actual_lines[length:]) or '<end>'
+
+
+if __name__ == "__main__":
+    trader_path = sys.argv[1] if sys.argv[1:] else 'Round1/trader.py'
+    paths = sys.argv[2:] or sorted(glob.glob(LOG_PATTERN))
+    trader_class = load_trader_class(trader_path)
+    start = time.perf_counter()
+    for path in paths:
+        result = replay_log(trader_class(), ExchangeLog(path))
+        if result.divergence is None:
+            print(f'{path}: all {result.ticks} ticks match')
+            continue
+        expected, actual = first_difference(result.divergence.expected, result.divergence.actual)
+        print(f'{path}: {result.ticks} ticks match, diverges at timestamp {result.divergence.timestamp}')
+        print(f'  expected: {expected[:200]}')
+        print(f'  actual:   {actual[:200]}')
+    print(f'replayed {len(paths)} logs in {time.perf_counter() - start:.2f}s')
@@ -0,0 +1,150 @@
+import sys
+import time
+from typing import Any, Callable, Dict, List, NamedTuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from Round2.backtester import POSITION_LIMITS
+from Round2.data_cache import load_prices
+from Round2.market_data import PriceData
+from Round2.order_book import ASK, BID, BookTensor
+from Round2.sweep import expand_grid
+
+R1 = 'Round1/Round1_DataAnalysis/prices_round_1_day_{}.csv'
+R3 = 'Round3/Round3_Data_Analysis/prices_round_3_day_{}.csv'
+
+
+class Book(NamedTuple):
+    """One product's best prices and mid on every tick of a day, NaN where it is missing."""
+    bid: np.ndarray
+    ask: np.ndarray
+    mid: np.ndarray
+
+
+class ScreenResult(NamedTuple):
+    position: np.ndarray
+    # Cash plus the position marked at the last known mid, after each tick
+    pnl: np.ndarray
+    trades: int
+    final_pnl: float
+
+
+def forward_fill(values: np.ndarray, valid: np.ndarray, fill: float = 0.0) -> np.ndarray:
+    """values with every invalid entry replaced by the last valid one before it, fill before the first."""
+    index = np.where(valid, np.arange(len(values)), -1)
+    np.maximum.accumulate(index, out=index)
+    return np.where(index >= 0, values[np.maximum(index, 0)], fill)
+
+
+def memory_windows(mid: np.ndarray, length: int):
+    """
+    The Trader's price memory after each tick: the last length mids it has
+    seen, zeros before it has seen that many. Ticks without a mid leave it
+    as it was, as update_price_memory skips them.
+    """
+    quoted = ~np.isnan(mid)
+    padded = np.concatenate((np.zeros(length - 1), mid[quoted]))
+    return sliding_window_view(padded, length), quoted
+
+
+def to_ticks(values: np.ndarray, quoted: np.ndarray) -> np.ndarray:
+    """Spread values computed on the quoted ticks back over every tick, holding the last one."""
+    full = np.zeros(len(quoted))
+    full[quoted] = values
+    return forward_fill(full, quoted, 0.0)
+
+
+def memory_ema(mid: np.ndarray, smoothing_factor: float, length: int) -> np.ndarray:
+    """PriceMemory.ema after each tick: the smoothing over the window, seeded with its oldest price."""
+    windows, quoted = memory_windows(mid, length)
+    weights = smoothing_factor * (1 - smoothing_factor) ** np.arange(length - 1, -1, -1)
+    weights[0] = (1 - smoothing_factor) ** (length - 1)
+    return to_ticks(windows @ weights, quoted)
+
+
+def memory_sma(mid: np.ndarray, sma_length: int, length: int) -> np.ndarray:
+    """PriceMemory.sma after each tick: the mean of the newest sma_length prices of the window."""
+    windows, quoted = memory_windows(mid, length)
+    return to_ticks(windows[:, length - sma_length:].mean(axis=1), quoted)
+
+
+def ema_threshold_signal(book: Book, smoothing_factor: float = 0.2, std_dev: float = 50,
+                         memory_length: int = 20) -> np.ndarray:
+    """
+    calc_orders_for_product as a target: long where the ask is std_dev or
+    more under the smoothed price, short where the bid is as far above it.
+    """
+    ema = memory_ema(book.mid, smoothing_factor, memory_length)
+    return crossing_target(book.ask <= ema - std_dev, book.bid >= ema + std_dev)
+
+
+def band_signal(book: Book, lower: float = 0.98, upper: float = 1.02, sma_length: int = 10,
+                memory_length: int = 20) -> np.ndarray:
+    """calc_roses_orders as a target: long under lower times the moving average, short over upper times it."""
+    sma = memory_sma(book.mid, sma_length, memory_length)
+    return crossing_target(book.ask < sma * lower, book.bid > sma * upper)
+
+
+def crossing_target(buy: np.ndarray, sell: np.ndarray) -> np.ndarray:
+    """+1 where only buy holds, -1 where only sell does, NaN (keep the position) elsewhere."""
+    return np.where(buy & ~sell, 1.0, np.where(sell & ~buy, -1.0, np.nan))
+
+
+SIGNALS: Dict[str, Callable[..., np.ndarray]] = {
+    'ema_threshold': ema_threshold_signal,
+    'bands': band_signal,
+}
+
+
+def product_book(tensor: BookTensor, product: str) -> Book:
+    i = tensor.product_index[product]
+    bid = tensor.best(BID)[:, i]
+    ask = tensor.best(ASK)[:, i]
+    return Book(bid, ask, (bid + ask) / 2)
+
+
+def screen(book: Book, target: np.ndarray, limit: int) -> ScreenResult:
+    """
+    Hold target times limit from each tick a signal fires until the next one,
+    buying at the best ask and selling at the best bid of the tick the
+    position changes on. The whole change fills at once, whatever volume the
+    book shows there: this ranks parameters, the Backtester gives the real PnL.
+    """
+    fired = ~np.isnan(target)
+    position = forward_fill(np.nan_to_num(target) * limit, fired, 0.0)
+    change = np.diff(position, prepend=0.0)
+    fill_price = np.where(change > 0, book.ask, np.where(change < 0, book.bid, 0.0))
+    cash = -np.cumsum(change * np.nan_to_num(fill_price))
+    mid = forward_fill(book.mid, ~np.isnan(book.mid), 0.0)
+    pnl = cash + position * mid
+    return ScreenResult(position, pnl, int(np.count_nonzero(change)), float(pnl[-1]))
+
+
+def screen_grid(prices: PriceData, product: str, signal: str, grid: Dict[str, List[Any]],
+                limit: int = None) -> pd.DataFrame:
+    """Screen every point of a parameter grid on one product, best final PnL first."""
+    book = product_book(BookTensor(prices), product)
+    limit = POSITION_LIMITS[product] if limit is None else limit
+    rows = []
+    for params in expand_grid(grid):
+        result = screen(book, SIGNALS[signal](book, **params), limit)
+        rows.append({**params, 'trades': result.trades, 'pnl': result.final_pnl})
+    return pd.DataFrame(rows).sort_values('pnl', ascending=False, kind='stable').reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    day = int(sys.argv[1]) if sys.argv[1:] else 0
+    prices = load_prices(R1.format(day - 2), R3.format(day), day=day)
+    screens = [
+        ('STRAWBERRIES', 'ema_threshold', {'smoothing_factor': [0.05, 0.1, 0.2, 0.4], 'std_dev': [1, 2, 5, 10, 50]}),
+        ('CHOCOLATE', 'ema_threshold', {'smoothing_factor': [0.05, 0.1, 0.2, 0.4], 'std_dev': [1, 2, 5, 10, 50]}),
+        ('ROSES', 'bands', {'lower': [0.98, 0.99, 0.995, 0.999], 'upper': [1.001, 1.005, 1.01, 1.02]}),
+    ]
+    for product, signal, grid in screens:
+        start = time.perf_counter()
+        table = screen_grid(prices, product, signal, grid)
+        elapsed = time.perf_counter() - start
+        print(f'{product} {signal}: {len(table)} parameter sets in {elapsed * 1000:.0f}ms')
+        print(table.head(5).to_string(index=False))
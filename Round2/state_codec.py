@@ -0,0 +1,131 @@
+import json
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+from Round2.compact_datamodel import ConversionObservation, Listing, Observation, Order
+from Round2.compact_datamodel import OrderDepth, Symbol, Trade, TradingState
+
+# TradingState.toJSON is json.dumps with sort_keys and the default separators.
+# Handing the encoder plain dicts and lists built from the known fields skips
+# the Python default() callback it would make for every nested object.
+_encoder = json.JSONEncoder(sort_keys=True, check_circular=False)
+
+
+class RecordedTick(NamedTuple):
+    """One line of a Backtester.run recording: the state the Trader saw and what its run returned."""
+    state: TradingState
+    orders: Dict[Symbol, List[Order]]
+    conversions: Optional[int]
+    trader_data: str
+
+
+def plain_listings(listings: Dict[Symbol, Listing]) -> Dict[Symbol, Any]:
+    return {symbol: {'denomination': listing.denomination, 'product': listing.product, 'symbol': listing.symbol}
+            for symbol, listing in listings.items()}
+
+
+def plain_order_depths(order_depths: Dict[Symbol, OrderDepth]) -> Dict[Symbol, Any]:
+    return {symbol: {'buy_orders': depth.buy_orders, 'sell_orders': depth.sell_orders}
+            for symbol, depth in order_depths.items()}
+
+
+def plain_trades(trades: Dict[Symbol, List[Trade]]) -> Dict[Symbol, Any]:
+    return {symbol: [{'buyer': trade.buyer, 'price': trade.price, 'quantity': trade.quantity,
+                      'seller': trade.seller, 'symbol': trade.symbol, 'timestamp': trade.timestamp}
+                     for trade in symbol_trades]
+            for symbol, symbol_trades in trades.items()}
+
+
+def plain_observations(observations: Observation) -> Dict[str, Any]:
+    return {
+        'conversionObservations': {
+            product: {'askPrice': o.askPrice, 'bidPrice': o.bidPrice, 'exportTariff': o.exportTariff,
+                      'humidity': o.humidity, 'importTariff': o.importTariff, 'sunlight': o.sunlight,
+                      'transportFees': o.transportFees}
+            for product, o in observations.conversionObservations.items()},
+        'plainValueObservations': observations.plainValueObservations,
+    }
+
+
+def encode_state(state: TradingState) -> str:
+    """The same text as state.toJSON(), without a callback per nested object."""
+    return _encoder.encode({
+        'listings': plain_listings(state.listings),
+        'market_trades': plain_trades(state.market_trades),
+        'observations': plain_observations(state.observations),
+        'order_depths': plain_order_depths(state.order_depths),
+        'own_trades': plain_trades(state.own_trades),
+        'position': state.position,
+        'timestamp': state.timestamp,
+        'traderData': state.traderData,
+    })
+
+
+def encode_orders(orders: Dict[Symbol, List[Order]]) -> str:
+    """What json.dumps(orders, cls=ProsperityEncoder, sort_keys=True) gives for a Trader's orders."""
+    return _encoder.encode({symbol: [{'price': order.price, 'quantity': order.quantity, 'symbol': order.symbol}
+                                     for order in symbol_orders]
+                            for symbol, symbol_orders in orders.items()})
+
+
+def decode_trades(trades: Dict[str, List[Dict[str, Any]]]) -> Dict[Symbol, List[Trade]]:
+    return {symbol: [Trade(t['symbol'], t['price'], t['quantity'], t['buyer'], t['seller'], t['timestamp'])
+                     for t in symbol_trades]
+            for symbol, symbol_trades in trades.items()}
+
+
+def state_from_fields(fields: Dict[str, Any]) -> TradingState:
+    """
+    TradingState from json.loads of its toJSON. JSON object keys are strings,
+    so the prices of the order depths are turned back into ints.
+    """
+    order_depths = {}
+    for symbol, depth in fields['order_depths'].items():
+        order_depth = order_depths[symbol] = OrderDepth()
+        order_depth.buy_orders = {int(price): volume for price, volume in depth['buy_orders'].items()}
+        order_depth.sell_orders = {int(price): volume for price, volume in depth['sell_orders'].items()}
+    observations = fields['observations']
+    return TradingState(
+        traderData=fields['traderData'],
+        timestamp=fields['timestamp'],
+        listings={symbol: Listing(listing['symbol'], listing['product'], listing['denomination'])
+                  for symbol, listing in fields['listings'].items()},
+        order_depths=order_depths,
+        own_trades=decode_trades(fields['own_trades']),
+        market_trades=decode_trades(fields['market_trades']),
+        position=fields['position'],
+        observations=Observation(
+            observations['plainValueObservations'],
+            {product: ConversionObservation(o['bidPrice'], o['askPrice'], o['transportFees'], o['exportTariff'],
+                                            o['importTariff'], o['sunlight'], o['humidity'])
+             for product, o in observations['conversionObservations'].items()}),
+    )
+
+
+def orders_from_fields(fields: Dict[str, List[Dict[str, Any]]]) -> Dict[Symbol, List[Order]]:
+    return {symbol: [Order(o['symbol'], o['price'], o['quantity']) for o in symbol_orders]
+            for symbol, symbol_orders in fields.items()}
+
+
+def decode_state(text: str) -> TradingState:
+    """TradingState from the text of encode_state or toJSON."""
+    return state_from_fields(json.loads(text))
+
+
+def decode_orders(text: str) -> Dict[Symbol, List[Order]]:
+    return orders_from_fields(json.loads(text))
+
+
+def encode_tick(state_json: str, orders: Dict[Symbol, List[Order]], conversions: Optional[int],
+                trader_data: str) -> str:
+    """One recording line, from the state's encode_state text and what trader.run returned for it."""
+    return (f'{{"conversions": {_encoder.encode(conversions)}, "orders": {encode_orders(orders)}, '
+            f'"state": {state_json}, "traderData": {_encoder.encode(trader_data)}}}')
+
+
+def read_recording(path: str) -> Iterator[RecordedTick]:
+    """Stream the ticks of a recording written by Backtester.run, one line at a time."""
+    with open(path) as file:
+        for line in file:
+            fields = json.loads(line)
+            yield RecordedTick(state_from_fields(fields['state']), orders_from_fields(fields['orders']),
+                               fields['conversions'], fields['traderData'])
@@ -0,0 +1,127 @@
+import itertools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from Round2.backtester import Backtester, load_trader_class
+from Round2.data_cache import ensure_cache, load_prices
+
+# Filled once per worker process by init_worker and reused by every job it runs
+worker_backtesters: Dict[Any, Backtester] = {}
+worker_trader_class = None
+
+
+def configure_trader(trader, params: Dict[str, Any]):
+    """
+    Override Trader attributes with the values of one grid point.
+
+    A name like 'std_dev.ROSES' sets a single entry of a dict attribute, while a
+    plain value given for a dict attribute sets it for every product. The price
+    memory, basket spread and coupon pricing that __init__ built from the
+    defaults are rebuilt afterwards.
+    """
+    for name, value in params.items():
+        attribute, _, key = name.partition('.')
+        current = getattr(trader, attribute)
+        if key:
+            current[key] = value
+        elif isinstance(current, dict) and not isinstance(value, dict):
+            setattr(trader, attribute, {product: value for product in current})
+        else:
+            setattr(trader, attribute, value)
+
+    if hasattr(trader, 'init_basket_spread'):
+        trader.init_basket_spread()
+    if hasattr(trader, 'init_coupon_pricing'):
+        trader.init_coupon_pricing()
+    if hasattr(trader, 'init_price_memory'):
+        trader.init_price_memory()
+    elif 'memory_length' in params:
+        trader.price_memory = {
+            product: [0] * trader.memory_length for product in trader.price_memory}
+
+
+def expand_grid(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+
+def init_worker(trader_path: str, days: Dict[Any, List[str]]):
+    global worker_trader_class
+    # The traders print on every tick, which would only slow the sweep down
+    sys.stdout = open(os.devnull, 'w')
+    worker_trader_class = load_trader_class(trader_path)
+    for day, paths in days.items():
+        worker_backtesters[day] = Backtester(load_prices(*paths, day=day))
+
+
+def run_job(job):
+    params, day = job
+    trader = worker_trader_class()
+    configure_trader(trader, params)
+    backtester = worker_backtesters[day]
+    backtester.reset()
+    return sum(backtester.run(trader).values())
+
+
+def run_grid_points(trader_path: str, days: Dict[Any, List[str]], grid_points: List[Dict[str, Any]],
+                    max_workers: int = None) -> List[List[float]]:
+    """
+    Backtest every parameter set on every day and return their PnLs, one list per set.
+
+    days maps a day label to the price files replayed as that day; files of
+    several rounds can be combined so a trader sees all the products it trades.
+    Each worker loads the market data once and then runs (params, day) jobs.
+    """
+    jobs = [(params, day) for params in grid_points for day in days]
+    max_workers = max_workers or os.cpu_count()
+    # Build any missing caches up front so the workers only have to map them
+    for paths in days.values():
+        for path in paths:
+            ensure_cache(path)
+    chunksize = max(1, len(jobs) // (max_workers * 4))
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker,
+                             initargs=(trader_path, days)) as executor:
+        pnls = list(executor.map(run_job, jobs, chunksize=chunksize))
+    return [pnls[i * len(days):(i + 1) * len(days)] for i in range(len(grid_points))]
+
+
+def rank(grid_points: List[Dict[str, Any]], days: Dict[Any, List[str]],
+         pnls: List[List[float]]) -> pd.DataFrame:
+    rows = []
+    for params, day_pnls in zip(grid_points, pnls):
+        row = {name: str(value) if isinstance(value, (dict, tuple, list)) else value
+               for name, value in params.items()}
+        for day, pnl in zip(days, day_pnls):
+            row[f'pnl_day_{day}'] = pnl
+        row['total_pnl'] = sum(day_pnls)
+        rows.append(row)
+
+    table = pd.DataFrame(rows)
+    return table.sort_values('total_pnl', ascending=False, ignore_index=True)
+
+
+def run_sweep(trader_path: str, days: Dict[Any, List[str]], grid: Dict[str, List[Any]],
+              max_workers: int = None) -> pd.DataFrame:
+    """Backtest every combination of grid on every day and rank them by total PnL."""
+    grid_points = expand_grid(grid)
+    return rank(grid_points, days, run_grid_points(trader_path, days, grid_points, max_workers))
+
+
+if __name__ == "__main__":
+    # Round 3 trades the Round 1 products as well, so pair up the days of both rounds
+    days = {
+        day: [f'Round1/Round1_DataAnalysis/prices_round_1_day_{day - 2}.csv',
+              f'Round3/Round3_Data_Analysis/prices_round_3_day_{day}.csv']
+        for day in (0, 1, 2)
+    }
+    grid = {
+        'std_dev': [25, 50, 100],
+        'smoothing_factor': [0.1, 0.2, 0.4],
+        'roses_bands': [(0.98, 1.02), (0.99, 1.01)],
+    }
+    print(run_sweep('Round3/trader.py', days, grid).to_string())
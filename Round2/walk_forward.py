@@ -0,0 +1,95 @@
+import argparse
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from Round2.backtester import load_trader_class
+from Round2.features import day_features
+from Round2.sweep import expand_grid, run_grid_points
+
+R1 = 'Round1/Round1_DataAnalysis/prices_round_1_day_{}.csv'
+R3 = 'Round3/Round3_Data_Analysis/prices_round_3_day_{}.csv'
+R4 = 'Round4/Round4_Data_Analysis/prices_round_4_day_{}.csv'
+
+# Trader file and the price files replayed as each of its days, in order. Later
+# rounds' days are merged with the earlier rounds' days that came as many days
+# before, as in sweep.py, so every product the Trader trades is quoted
+ROUND3_DAYS = {day: [R1.format(day - 2), R3.format(day)] for day in (0, 1, 2)}
+ROUND4_DAYS = {day: [R1.format(day - 3), R3.format(day - 1), R4.format(day)] for day in (1, 2, 3)}
+ROUNDS = {
+    'Round1': ('Round1/trader.py', {day: [R1.format(day)] for day in (-2, -1, 0)}),
+    'Round3': ('Round3/trader.py', ROUND3_DAYS),
+    'Round4': ('Round4/trader.py', ROUND4_DAYS),
+    'Round5': ('Round5/trader.py', ROUND4_DAYS),
+}
+# std_dev_scale is not a Trader attribute: it scales the std_dev fitted on the training days
+GRID = {
+    'std_dev_scale': [0.5, 1.0, 2.0],
+    'smoothing_factor': [0.1, 0.2, 0.4],
+}
+TRAIN_DAYS = 2
+
+
+def fitted_std_dev(train_paths: List[List[str]], products: List[str],
+                   smoothing_factor: float) -> Dict[str, float]:
+    """Standard deviation of each product's mid around its EMA over the training days."""
+    deviations: Dict[str, List[np.ndarray]] = {product: [] for product in products}
+    for paths in train_paths:
+        for path in paths:
+            features = day_features(path, smoothing_factor)
+            for product in products:
+                if f'{product}/mid' in features:
+                    deviations[product].append(features[f'{product}/mid'] - features[f'{product}/ema'])
+    return {product: float(np.std(np.concatenate(values)))
+            for product, values in deviations.items() if values}
+
+
+def fold_params(defaults, train_paths: List[List[str]], point: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a grid point into Trader attributes, fitting std_dev on the training days when it is scaled."""
+    params = dict(point)
+    scale = params.pop('std_dev_scale', None)
+    if scale is not None:
+        smoothing_factor = params.get('smoothing_factor', defaults.smoothing_factor)
+        fitted = fitted_std_dev(train_paths, list(defaults.std_dev), smoothing_factor)
+        params['std_dev'] = {product: scale * fitted[product] if product in fitted else default
+                             for product, default in defaults.std_dev.items()}
+    return params
+
+
+def walk_forward(trader_path: str, days: Dict[Any, List[str]], grid: Dict[str, List[Any]],
+                 train_days: int = TRAIN_DAYS, max_workers: int = None) -> pd.DataFrame:
+    """
+    Pick the best grid point on the train_days days before each day and test it
+    on that day, next to the Trader's own defaults. Only days after the first
+    train_days are tested, so nothing is ever tuned on the day it is scored on.
+    """
+    labels = list(days)
+    defaults = load_trader_class(trader_path)()
+    grid_points = expand_grid(grid)
+    rows = []
+    for i in range(train_days, len(labels)):
+        train = {label: days[label] for label in labels[i - train_days:i]}
+        test = {labels[i]: days[labels[i]]}
+        params = [fold_params(defaults, list(train.values()), point) for point in grid_points]
+
+        train_pnls = [sum(pnls) for pnls in run_grid_points(trader_path, train, params, max_workers)]
+        best = int(np.argmax(train_pnls))
+        (test_pnl,), (default_pnl,) = run_grid_points(trader_path, test, [params[best], {}], max_workers)
+
+        row = {'test_day': labels[i], 'train_days': ','.join(str(label) for label in train)}
+        row.update(grid_points[best])
+        row.update({'train_pnl': train_pnls[best], 'test_pnl': test_pnl, 'default_test_pnl': default_pnl})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Walk-forward tuning of each round\'s Trader')
+    parser.add_argument('rounds', nargs='*', default=list(ROUNDS))
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    for round_name in args.rounds:
+        trader_path, days = ROUNDS[round_name]
+        print(round_name)
+        print(walk_forward(trader_path, days, GRID, max_workers=args.workers).to_string(index=False))
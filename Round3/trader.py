@@ -1,5 +1,451 @@
 from datamodel import Order, TradingState
 import numpy as np
+import base64
+import struct
+import zlib
+from array import array
+from bisect import bisect_left
+from inspect import Parameter, signature
+from itertools import accumulate
+from math import sqrt
+from time import perf_counter_ns
+
+
+DEBUG = 10
+INFO = 20
+
+
+class PrintLogger:
+    """
+    The level gate of the tutorial Logger, printing straight to stdout: a
+    message below level is dropped before any of it is formatted.
+    """
+
+    def __init__(self, level=INFO):
+        self.level = level
+
+    def log(self, level, message, *args):
+        if level >= self.level:
+            print(message % args if args else message)
+
+    def debug(self, message, *args):
+        self.log(DEBUG, message, *args)
+
+    def info(self, message, *args):
+        self.log(INFO, message, *args)
+
+
+class PriceMemory:
+    """
+    The last `length` mid prices of a product in a fixed ring buffer, with the
+    windowed exponential smoothing and the short moving average kept up to date
+    in constant time per price.
+
+    The smoothing matches the old loop over the window, seeded with its oldest
+    price, up to float rounding. With exact=True both values are recomputed
+    from the window on every read instead, reproducing the old results bit for
+    bit so the fast path can be checked against them.
+    """
+
+    def __init__(self, length, smoothing_factor, sma_length=10, exact=False):
+        if length < 1:
+            raise ValueError("PriceMemory length must be at least 1, got %r" % (length,))
+        if not 0 <= smoothing_factor <= 1:
+            raise ValueError("PriceMemory smoothing_factor must be within [0, 1], got %r" % (smoothing_factor,))
+        self.length = length
+        self.alpha = smoothing_factor
+        self.sma_length = min(sma_length, length)
+        self.exact = exact
+        self.prices = array('d', [0.0] * length)
+        # Slot of the oldest price, which the next append overwrites
+        self.start = 0
+        self.appended = 0
+
+        # Weight of the oldest price in the smoothed value, and of the price after it.
+        # A window of one price has no second one (and 0 ** -1 would raise for alpha == 1)
+        self.oldest_weight = (1 - self.alpha) ** (length - 1)
+        self.second_weight = self.alpha * (1 - self.alpha) ** (length - 2) if length > 1 else 0.0
+        # Smoothing contribution of every price but the oldest, and the sum of the newest sma_length
+        self.newer_part = 0.0
+        self.sma_sum = 0.0
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        """The i-th oldest price; negative indices count back from the newest."""
+        return self.prices[(self.start + i) % self.length]
+
+    def __iter__(self):
+        for i in range(self.length):
+            yield self.prices[(self.start + i) % self.length]
+
+    def latest(self, count):
+        return [self[i] for i in range(self.length - count, self.length)]
+
+    def append(self, price):
+        if self.length > 1:
+            self.newer_part = self.alpha * price + \
+                (1 - self.alpha) * (self.newer_part - self.second_weight * self[1])
+        self.sma_sum += price - self[self.length - self.sma_length]
+
+        self.prices[self.start] = price
+        self.start = (self.start + 1) % self.length
+        self.appended += 1
+        if self.appended % self.length == 0:
+            # Resynchronise the running sum once per lap so rounding cannot pile up
+            self.sma_sum = sum(self.latest(self.sma_length))
+
+    def ema(self):
+        if self.exact:
+            smooth_price = self[0]
+            for i in range(1, self.length):
+                smooth_price = self.alpha * self[i] + \
+                    (1 - self.alpha) * smooth_price
+            return smooth_price
+        return self.oldest_weight * self[0] + self.newer_part
+
+    def sma(self):
+        if self.exact:
+            return np.mean(self.latest(self.sma_length))
+        return self.sma_sum / self.sma_length
+
+
+class TraderDataCodec:
+    """
+    Versioned binary snapshot of the price memories and the basket spread,
+    handed back to us in traderData so they survive the exchange running a
+    tick in a fresh process.
+
+    Layout before base64: version and flags bytes; with the SPREAD flag the
+    spread's window length, count, running sums and latest spread (NaN for
+    none yet) followed by its window; then for every product its name, ring
+    buffer position and running EMA/SMA sums followed by the window. Windows
+    are packed doubles. zlib costs more than the rest of the encode put
+    together, so the body is only compressed when its base64 would be longer
+    than compress_over (max_size unless given; 0 always tries) and that makes
+    it shorter. A snapshot still over max_size is dropped in favour of
+    starting cold.
+    """
+
+    VERSION = 2
+    COMPRESSED = 1
+    SPREAD = 2
+    HEADER = struct.Struct('<BB')
+    # Window length, count, total, total_squares, spread
+    BASKET = struct.Struct('<HIddd')
+    # Name length, window length, start, appended, newer_part, sma_sum
+    MEMORY = struct.Struct('<BHHIdd')
+
+    def __init__(self, max_size=8000, compress_over=None):
+        self.max_size = max_size
+        self.compress_over = max_size if compress_over is None else compress_over
+
+    def encode(self, price_memory, basket_spread=None):
+        parts = []
+        flags = 0
+        if basket_spread is not None:
+            flags = self.SPREAD
+            last = basket_spread.spread
+            parts.append(self.BASKET.pack(basket_spread.window, basket_spread.count, basket_spread.total,
+                                          basket_spread.total_squares, float('nan') if last is None else last))
+            parts.append(basket_spread.spreads.tobytes())
+        for product, memory in price_memory.items():
+            name = product.encode()
+            parts.append(self.MEMORY.pack(len(name), memory.length, memory.start, memory.appended,
+                                          memory.newer_part, memory.sma_sum))
+            parts.append(name)
+            parts.append(memory.prices.tobytes())
+        body = b''.join(parts)
+
+        # Length of the base64 text of the header and body
+        if 4 * ((self.HEADER.size + len(body) + 2) // 3) > self.compress_over:
+            packed = zlib.compress(body, 1)
+            if len(packed) < len(body):
+                body = packed
+                flags |= self.COMPRESSED
+        trader_data = base64.b64encode(self.HEADER.pack(self.VERSION, flags) + body).decode('ascii')
+        return trader_data if len(trader_data) <= self.max_size else ''
+
+    def decode(self, trader_data, price_memory, basket_spread=None):
+        """
+        Restore price_memory, and basket_spread when given, in place from a
+        snapshot. Products or a spread whose window length changed are left as
+        they are; anything that is not a snapshot of this version (like the
+        old "SAMPLE") returns False and changes nothing.
+        """
+        try:
+            raw = base64.b64decode(trader_data, validate=True)
+            version, flags = self.HEADER.unpack_from(raw)
+            if version != self.VERSION:
+                return False
+            body = raw[self.HEADER.size:]
+            if flags & self.COMPRESSED:
+                body = zlib.decompress(body)
+
+            spread_snapshot = None
+            offset = 0
+            if flags & self.SPREAD:
+                window, count, total, total_squares, last = self.BASKET.unpack_from(body)
+                offset = self.BASKET.size
+                spreads = array('d')
+                spreads.frombytes(body[offset:offset + spreads.itemsize * window])
+                offset += spreads.itemsize * window
+                spread_snapshot = (window, count, total, total_squares, last, spreads)
+
+            snapshots = []
+            while offset < len(body):
+                name_length, length, start, appended, newer_part, sma_sum = \
+                    self.MEMORY.unpack_from(body, offset)
+                offset += self.MEMORY.size
+                product = body[offset:offset + name_length].decode()
+                offset += name_length
+                prices = array('d')
+                prices.frombytes(body[offset:offset + prices.itemsize * length])
+                offset += prices.itemsize * length
+                snapshots.append((product, length, start, appended, newer_part, sma_sum, prices))
+        except (ValueError, struct.error, zlib.error):
+            return False
+
+        for product, length, start, appended, newer_part, sma_sum, prices in snapshots:
+            memory = price_memory.get(product)
+            if memory is None or memory.length != length or len(prices) != length:
+                continue
+            memory.prices = prices
+            memory.start = start
+            memory.appended = appended
+            memory.newer_part = newer_part
+            memory.sma_sum = sma_sum
+
+        if spread_snapshot is not None and basket_spread is not None:
+            window, count, total, total_squares, last, spreads = spread_snapshot
+            if basket_spread.window == window and len(spreads) == window:
+                basket_spread.spreads = spreads
+                basket_spread.count = count
+                basket_spread.total = total
+                basket_spread.total_squares = total_squares
+                # NaN stands for no spread seen yet
+                basket_spread.spread = None if last != last else last
+        return True
+
+
+class BasketSpread:
+    """
+    GIFT_BASKET mid minus the weighted mids of its constituents, with the mean
+    and population std of the last `window` spreads (of all of them until
+    that many have been seen) kept up to date in constant time per tick.
+
+    Mids are on half ticks, so the running sums stay exact and the numbers
+    match the offline Round2/basket.py statistics to the last bit.
+    """
+
+    def __init__(self, weights, window):
+        self.weights = weights
+        self.window = window
+        self.spreads = array('d', [0.0] * window)
+        self.count = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.spread = None
+
+    def update(self, basket_mid, mids):
+        spread = basket_mid
+        for product, weight in self.weights.items():
+            spread -= weight * mids[product]
+
+        slot = self.count % self.window
+        if self.count >= self.window:
+            oldest = self.spreads[slot]
+            self.total -= oldest
+            self.total_squares -= oldest * oldest
+        self.spreads[slot] = spread
+        self.total += spread
+        self.total_squares += spread * spread
+        self.count += 1
+        self.spread = spread
+        return spread
+
+    def mean(self):
+        return self.total / min(self.count, self.window)
+
+    def std(self):
+        count = min(self.count, self.window)
+        return sqrt(max(self.total_squares - self.total * self.total / count, 0.0) / count)
+
+
+class cached_attribute:
+    """Like functools.cached_property, without the per-access lock it takes on Python 3.11."""
+
+    def __init__(self, method):
+        self.method = method
+        self.name = method.__name__
+        self.__doc__ = method.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        # Stored on the instance, which shadows this descriptor from then on
+        value = instance.__dict__[self.name] = self.method(instance)
+        return value
+
+
+class BookView:
+    """
+    Read-only view of one tick's OrderDepth. Every figure is worked out the
+    first time a strategy asks for it and then reused by the others.
+    """
+
+    def __init__(self, order_depth):
+        self.buy_orders = order_depth.buy_orders
+        self.sell_orders = order_depth.sell_orders
+
+    @cached_attribute
+    def best_bid(self):
+        return max(self.buy_orders) if self.buy_orders else None
+
+    @cached_attribute
+    def best_ask(self):
+        return min(self.sell_orders) if self.sell_orders else None
+
+    @cached_attribute
+    def mid_price(self):
+        if self.best_bid is None or self.best_ask is None:
+            return None
+        return (self.best_ask + self.best_bid) / 2
+
+    @cached_attribute
+    def spread(self):
+        if self.best_bid is None or self.best_ask is None:
+            return None
+        return self.best_ask - self.best_bid
+
+    @cached_attribute
+    def bids(self):
+        """(price, volume) levels from the best bid down."""
+        return sorted(self.buy_orders.items(), reverse=True)
+
+    @cached_attribute
+    def asks(self):
+        """(price, volume) levels from the best ask up, volumes negative as in OrderDepth."""
+        return sorted(self.sell_orders.items())
+
+    @cached_attribute
+    def bid_depth(self):
+        """Total bid volume at each level of bids and better."""
+        return list(accumulate(volume for _, volume in self.bids))
+
+    @cached_attribute
+    def ask_depth(self):
+        """Total (positive) ask volume at each level of asks and better."""
+        return list(accumulate(-volume for _, volume in self.asks))
+
+
+class TimingHistogram:
+    """Running count, total, maximum and log-spaced histogram of nanosecond timings."""
+
+    # Bucket upper edges from 1us up to about 65ms, four to an octave; slower calls land in one more bucket
+    BOUNDS = [round(1000 * 2 ** (i / 4)) for i in range(64)]
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.maximum = 0
+        self.buckets = [0] * (len(self.BOUNDS) + 1)
+
+    def add(self, elapsed):
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.maximum:
+            self.maximum = elapsed
+        self.buckets[bisect_left(self.BOUNDS, elapsed)] += 1
+
+    def quantile(self, q):
+        """Upper edge of the bucket the q quantile falls in, in nanoseconds, never past the maximum."""
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min(self.BOUNDS[i], self.maximum) if i < len(self.BOUNDS) else self.maximum
+        return self.maximum
+
+
+class HotPathTimer:
+    """
+    perf_counter_ns timings of Trader.run and the strategies it calls, per
+    method and per product, as running histograms. Every report_every ticks a
+    summary of them, slowest in total first and cut to max_length characters,
+    is handed to emit. The default max_length leaves room for it among the
+    third of its 3750 characters the tutorial Logger gives to what was printed.
+    """
+
+    def __init__(self, emit=print, report_every=100, max_length=1000):
+        self.emit = emit
+        self.report_every = report_every
+        self.max_length = max_length
+        self.histograms = {}
+        self.ticks = 0
+
+    def histogram(self, label):
+        histogram = self.histograms.get(label)
+        if histogram is None:
+            histogram = self.histograms[label] = TimingHistogram()
+        return histogram
+
+    def wrap(self, method, label=None):
+        """
+        Time every call of a bound method. Calls of a method with a product
+        parameter are kept apart by product, e.g. calc_orders_for_product[ROSES].
+        """
+        label = label or method.__name__
+        parameters = list(signature(method).parameters.values())
+        names = [parameter.name for parameter in parameters]
+        position = names.index('product') if 'product' in names else None
+        default = None
+        if position is not None and parameters[position].default is not Parameter.empty:
+            default = parameters[position].default
+        histograms = {}
+
+        def timed(*args, **kwargs):
+            start = perf_counter_ns()
+            result = method(*args, **kwargs)
+            elapsed = perf_counter_ns() - start
+            product = None
+            if position is not None:
+                product = args[position] if len(args) > position else kwargs.get('product', default)
+            histogram = histograms.get(product)
+            if histogram is None:
+                histogram = histograms[product] = self.histogram(
+                    label if product is None else f'{label}[{product}]')
+            histogram.add(elapsed)
+            return result
+
+        return timed
+
+    def wrap_run(self, run):
+        timed_run = self.wrap(run)
+
+        def run_and_report(state):
+            result = timed_run(state)
+            self.ticks += 1
+            if self.ticks % self.report_every == 0:
+                self.emit(self.summary())
+            return result
+
+        return run_and_report
+
+    def summary(self):
+        """One line per method and product: calls, then p50, p99 and maximum in microseconds."""
+        header = f'timing {self.ticks} ticks: label n p50 p99 max us'
+        ranked = sorted(self.histograms.items(), key=lambda item: item[1].total, reverse=True)
+        rows = [f'{label} {histogram.count} {histogram.quantile(0.5) / 1000:.0f} '
+                f'{histogram.quantile(0.99) / 1000:.0f} {histogram.maximum / 1000:.0f}'
+                for label, histogram in ranked]
+        text = '\n'.join([header] + rows)
+        while len(text) > self.max_length and rows:
+            rows.pop()
+            text = '\n'.join([header] + rows + [f'+{len(ranked) - len(rows)} more'])
+        return text
 
 
 class Trader:
@@ -13,32 +459,69 @@ class Trader:
             'STRAWBERRIES': 350, 'ROSES': 60, 'GIFT_BASKET': 60
         }
         self.memory_length = 20
-        self.price_memory = {
-            product: [0] * self.memory_length for product in self.target_prices}
         # Adjust based on volatility
         self.std_dev = {product: 50 for product in self.target_prices}
         self.smoothing_factor = 0.2
+        # Multipliers of the ROSES moving average below/above which we buy/sell
+        self.roses_bands = (0.98, 1.02)
+        # Recompute the smoothed prices from the window, for checking against old results
+        self.exact_smoothing = False
+        self.init_price_memory()
+        # BookViews of the tick being traded, rebuilt whenever a new state comes in
+        self.book_state = None
+        self.books = {}
+        # The traderData we last returned, the exchange hands it back on the next tick
+        self.codec = TraderDataCodec()
+        self.trader_data = ''
+        # GIFT_BASKET against the 4 CHOCOLATE, 6 STRAWBERRIES and 1 ROSES it holds
+        self.basket_weights = {'CHOCOLATE': 4, 'STRAWBERRIES': 6, 'ROSES': 1}
+        self.spread_window = 100
+        # z-score of the spread past which GIFT_BASKET is traded against it, None trades it on its own
+        self.basket_spread_entry = None
+        self.init_basket_spread()
+        # Strategy timings, only kept once enable_timing is called
+        self.timer = None
+        # Per-tick diagnostics go through logger.debug, skipped unless the level is lowered to DEBUG
+        self.logger = PrintLogger()
+
+    def enable_timing(self, emit=print, report_every=100, max_length=1000):
+        """
+        Time run, the traderData codec and every strategy from now on, and hand
+        a summary to emit (say the tutorial Logger's print) every report_every
+        ticks. The methods are wrapped on this instance only, so a Trader that
+        never calls this runs exactly as it did without the timer.
+        """
+        self.timer = HotPathTimer(emit, report_every, max_length)
+        for name in ('update_basket_spread', 'calc_basket_orders', 'calc_amethysts_orders',
+                     'calc_starfruit_orders', 'calc_orders_for_product', 'calc_roses_orders'):
+            setattr(self, name, self.timer.wrap(getattr(self, name)))
+        self.codec.encode = self.timer.wrap(self.codec.encode, 'codec.encode')
+        self.codec.decode = self.timer.wrap(self.codec.decode, 'codec.decode')
+        self.run = self.timer.wrap_run(self.run)
+
+    def init_price_memory(self):
+        self.price_memory = {
+            product: PriceMemory(self.memory_length, self.smoothing_factor, exact=self.exact_smoothing)
+            for product in self.target_prices}
 
-    def update_price_memory(self, product, order_depth):
-        best_ask = min(
-            order_depth.sell_orders) if order_depth.sell_orders else None
-        best_bid = max(
-            order_depth.buy_orders) if order_depth.buy_orders else None
-        if best_ask is not None and best_bid is not None:
-            mid_price = (best_ask + best_bid) / 2
-            self.price_memory[product].append(mid_price)
-            if len(self.price_memory[product]) > self.memory_length:
-                self.price_memory[product].pop(0)
+    def init_basket_spread(self):
+        self.basket_spread = BasketSpread(self.basket_weights, self.spread_window)
+
+    def book(self, state, product):
+        if state is not self.book_state:
+            self.book_state = state
+            self.books = {}
+        view = self.books.get(product)
+        if view is None:
+            view = self.books[product] = BookView(state.order_depths[product])
+        return view
+
+    def update_price_memory(self, product, book):
+        if book.mid_price is not None:
+            self.price_memory[product].append(book.mid_price)
 
     def predict_price_exponential_smoothing(self, product):
-        prices = self.price_memory[product]
-        if not prices:
-            return None
-        smooth_price = prices[0]
-        for price in prices[1:]:
-            smooth_price = self.smoothing_factor * price + \
-                (1 - self.smoothing_factor) * smooth_price
-        return smooth_price
+        return self.price_memory[product].ema()
 
     def calculate_trading_limits(self, product, current_position, price, direction):
         if direction == 'buy':
@@ -54,28 +537,58 @@ class Trader:
 
     def calc_orders_for_product(self, state, product):
         orders = []
-        order_depth = state.order_depths[product]
-        best_ask = min(
-            order_depth.sell_orders) if order_depth.sell_orders else None
-        best_bid = max(
-            order_depth.buy_orders) if order_depth.buy_orders else None
+        book = self.book(state, product)
+        best_ask = book.best_ask
+        best_bid = book.best_bid
         current_position = state.position.get(product, 0)
-        self.update_price_memory(product, order_depth)
+        self.update_price_memory(product, book)
         predicted_price = self.predict_price_exponential_smoothing(product)
 
         # Buy orders
         if best_ask and best_ask <= predicted_price - self.std_dev[product]:
             quantity = min(
-                self.position_limits[product] - current_position, order_depth.sell_orders[best_ask])
+                self.position_limits[product] - current_position, book.sell_orders[best_ask])
             orders.append(Order(product, best_ask, quantity))
         # Sell orders
         if best_bid and best_bid >= predicted_price + self.std_dev[product]:
             quantity = min(
-                current_position + self.position_limits[product], order_depth.buy_orders[best_bid])
+                current_position + self.position_limits[product], book.buy_orders[best_bid])
             orders.append(Order(product, best_bid, -quantity))
 
         return orders
 
+    def update_basket_spread(self, state):
+        basket_mid = self.book(state, "GIFT_BASKET").mid_price
+        mids = {product: self.book(state, product).mid_price for product in self.basket_weights}
+        if basket_mid is not None and None not in mids.values():
+            self.basket_spread.update(basket_mid, mids)
+
+    def calc_basket_orders(self, state, product="GIFT_BASKET"):
+        spread = self.basket_spread
+        if self.basket_spread_entry is None or spread.count < spread.window or spread.std() == 0:
+            return self.calc_orders_for_product(state, product)
+
+        orders = []
+        book = self.book(state, product)
+        current_position = state.position.get(product, 0)
+        self.update_price_memory(product, book)
+        zscore = (spread.spread - spread.mean()) / spread.std()
+
+        # Basket rich against its constituents: sell it
+        if zscore > self.basket_spread_entry and book.best_bid is not None:
+            quantity = min(current_position + self.position_limits[product],
+                           book.buy_orders[book.best_bid])
+            if quantity > 0:
+                orders.append(Order(product, book.best_bid, -quantity))
+        # Basket cheap against its constituents: buy it
+        elif zscore < -self.basket_spread_entry and book.best_ask is not None:
+            quantity = min(self.position_limits[product] - current_position,
+                           -book.sell_orders[book.best_ask])
+            if quantity > 0:
+                orders.append(Order(product, book.best_ask, quantity))
+
+        return orders
+
     def calc_specialty_orders(self, state, product):
         if product in ['AMETHYSTS', 'STARFRUIT'] == 'AMETHYSTS':
             return self.calc_amethysts_orders(state, product)
@@ -83,7 +596,7 @@ class Trader:
             return self.calc_starfruit_orders(state, product)
 
     def calc_amethysts_orders(self, state, product="AMETHYSTS"):
-        order_depth = state.order_depths[product]
+        book = self.book(state, product)
         orders = []
         current_position = state.position.get(product, 0)
         available_buy_limit = self.position_limits[product] - current_position
@@ -94,32 +607,32 @@ class Trader:
         acceptable_sell_price = self.target_prices[product] + \
             self.std_dev[product]
 
-        print("Acceptable buy price for", product, ":", acceptable_buy_price)
-        print("Acceptable sell price for", product, ":", acceptable_sell_price)
+        self.logger.debug("Acceptable buy price for %s : %s", product, acceptable_buy_price)
+        self.logger.debug("Acceptable sell price for %s : %s", product, acceptable_sell_price)
 
         # Decide on buy orders based on the sell side of the order book
-        for price, amount in sorted(order_depth.sell_orders.items()):
+        for price, amount in book.asks:
             if price <= acceptable_buy_price:
                 trade_amount = min(-amount, available_buy_limit)
                 if trade_amount > 0:
-                    print("BUY", product, "at", price, "for", trade_amount)
+                    self.logger.info("BUY %s at %s for %s", product, price, trade_amount)
                     orders.append(Order(product, price, trade_amount))
                     available_buy_limit -= trade_amount
 
         # Decide on sell orders based on the buy side of the order book
-        for price, amount in sorted(order_depth.buy_orders.items(), reverse=True):
+        for price, amount in book.bids:
             if price >= acceptable_sell_price:
                 trade_amount = min(amount, available_sell_limit)
                 if trade_amount > 0:
-                    print("SELL", product, "at", price, "for", trade_amount)
+                    self.logger.info("SELL %s at %s for %s", product, price, trade_amount)
                     orders.append(Order(product, price, -trade_amount))
                     available_sell_limit -= trade_amount
 
         return orders
 
     def calc_starfruit_orders(self, state, product="STARFRUIT"):
-        order_depth = state.order_depths[product]
-        self.update_price_memory(product, order_depth)
+        book = self.book(state, product)
+        self.update_price_memory(product, book)
         predicted_price = self.predict_price_exponential_smoothing(product)
         if predicted_price is None:
             return []
@@ -130,7 +643,7 @@ class Trader:
         available_sell_limit = self.position_limits[product] + current_position
 
         # Buy orders
-        for price, amount in sorted(order_depth.sell_orders.items()):
+        for price, amount in book.asks:
             if price <= predicted_price:
                 trade_amount = min(-amount, available_buy_limit)
                 if trade_amount > 0:
@@ -138,7 +651,7 @@ class Trader:
                     available_buy_limit -= trade_amount
 
         # Sell orders
-        for price, amount in sorted(order_depth.buy_orders.items(), reverse=True):
+        for price, amount in book.bids:
             if price >= predicted_price:
                 trade_amount = min(amount, available_sell_limit)
                 if trade_amount > 0:
@@ -148,41 +661,42 @@ class Trader:
         return orders
 
     def calc_roses_orders(self, state, product="ROSES"):
-        order_depth = state.order_depths[product]
-        best_ask = min(
-            order_depth.sell_orders) if order_depth.sell_orders else None
-        best_bid = max(
-            order_depth.buy_orders) if order_depth.buy_orders else None
+        book = self.book(state, product)
+        best_ask = book.best_ask
+        best_bid = book.best_bid
 
         # Update price memory and calculate the moving average
-        self.update_price_memory(product, order_depth)
+        self.update_price_memory(product, book)
         # last 10 prices for the moving average
-        moving_avg = np.mean(self.price_memory[product][-10:])
+        moving_avg = self.price_memory[product].sma()
 
         orders = []
-        if best_ask and best_ask < moving_avg * 0.98:  # Buy if the price is 2% below the moving average
+        if best_ask and best_ask < moving_avg * self.roses_bands[0]:  # Buy below the lower band around the moving average
             orders.append(Order(product, best_ask, min(
-                self.position_limits[product], order_depth.sell_orders[best_ask])))
-        if best_bid and best_bid > moving_avg * 1.02:  # Sell if the price is 2% above the moving average
+                self.position_limits[product], book.sell_orders[best_ask])))
+        if best_bid and best_bid > moving_avg * self.roses_bands[1]:  # Sell above the upper band around the moving average
             orders.append(Order(product, best_bid, -
-                                min(self.position_limits[product], order_depth.buy_orders[best_bid])))
+                                min(self.position_limits[product], book.buy_orders[best_bid])))
 
         return orders
 
     def run(self, state: TradingState):
-        print("traderData: " + state.traderData)
-        print("Observations: " + str(state.observations))
+        if state.traderData != self.trader_data:
+            # Run in a fresh process: carry on from the memory of the last tick
+            self.codec.decode(state.traderData, self.price_memory, self.basket_spread)
+        self.logger.debug("traderData: %d bytes", len(state.traderData))
+        self.logger.debug("Observations: %s", state.observations)
         result = {}
         result["AMETHYSTS"] = self.calc_amethysts_orders(state)
         result["STARFRUIT"] = self.calc_starfruit_orders(state)
-        result["GIFT_BASKET"] = self.calc_orders_for_product(
-            state, "GIFT_BASKET")
+        self.update_basket_spread(state)
+        result["GIFT_BASKET"] = self.calc_basket_orders(state)
         result["CHOCOLATE"] = self.calc_orders_for_product(state, "CHOCOLATE")
         result["ROSES"] = self.calc_roses_orders(state)
         result["STRAWBERRIES"] = self.calc_orders_for_product(
             state, "STRAWBERRIES")
 
-        traderData = "SAMPLE"  # Replace with actual trader state serialization logic
+        traderData = self.trader_data = self.codec.encode(self.price_memory, self.basket_spread)
         conversions = 1  # Replace with actual conversion logic
         # Make sure to pass the correct orders structure to the logger
         return result, conversions, traderData
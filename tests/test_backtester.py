@@ -0,0 +1,113 @@
+import math
+
+import pandas as pd
+import pytest
+
+from Round2.backtester import Backtester
+from Round2.compact_datamodel import Order
+from Round2.market_data import prices_from_frame
+
+PRODUCT = 'AMETHYSTS'
+LIMIT = 20
+
+
+def level_columns(side, levels):
+    columns = {}
+    for i in range(3):
+        price, volume = levels[i] if i < len(levels) else (math.nan, math.nan)
+        columns[f'{side}_price_{i + 1}'] = price
+        columns[f'{side}_volume_{i + 1}'] = volume
+    return columns
+
+
+def book_row(timestamp, bids, asks, mid_price):
+    return {'day': 0, 'timestamp': timestamp, 'product': PRODUCT,
+            **level_columns('bid', bids), **level_columns('ask', asks),
+            'mid_price': mid_price, 'profit_and_loss': 0.0}
+
+
+@pytest.fixture
+def backtester():
+    """
+    Two ticks of one product, volumes as in the CSV (positive on both sides):
+
+        tick 0: bids 9998 x 1, 9995 x 30   asks 10002 x 4, 10005 x 30   mid 10000
+        tick 1: bids 10001 x 5             asks 10004 x 10              mid 10002.5
+    """
+    frame = pd.DataFrame([
+        book_row(0, [(9998, 1), (9995, 30)], [(10002, 4), (10005, 30)], 10000.0),
+        book_row(100, [(10001, 5)], [(10004, 10)], 10002.5),
+    ])
+    backtester = Backtester(prices_from_frame(frame), position_limits={PRODUCT: LIMIT})
+    backtester.get_next_market_state()
+    return backtester
+
+
+def fills(backtester):
+    return [(trade.price, trade.quantity, trade.buyer, trade.seller)
+            for trade in backtester.own_trades.get(PRODUCT, [])]
+
+
+def test_buy_walks_the_asks_up_to_its_price(backtester):
+    backtester.execute_orders({PRODUCT: [Order(PRODUCT, 10005, 10)]})
+
+    assert fills(backtester) == [(10002, 4, 'SUBMISSION', ''), (10005, 6, 'SUBMISSION', '')]
+    assert backtester.position[PRODUCT] == 10
+    assert backtester.cash[PRODUCT] == -(4 * 10002 + 6 * 10005)
+
+
+def test_sell_fills_only_the_bids_it_crosses(backtester):
+    # 9995 is below the limit price, so only the single lot at 9998 fills
+    backtester.execute_orders({PRODUCT: [Order(PRODUCT, 9996, -3)]})
+
+    assert fills(backtester) == [(9998, 1, '', 'SUBMISSION')]
+    assert backtester.position[PRODUCT] == -1
+    assert backtester.cash[PRODUCT] == 9998
+
+
+def test_orders_share_the_volume_of_a_level(backtester):
+    backtester.execute_orders({PRODUCT: [Order(PRODUCT, 10002, 3), Order(PRODUCT, 10002, 3)]})
+
+    assert fills(backtester) == [(10002, 3, 'SUBMISSION', ''), (10002, 1, 'SUBMISSION', '')]
+    assert backtester.position[PRODUCT] == 4
+
+
+def test_order_inside_the_spread_does_not_fill(backtester):
+    backtester.execute_orders({PRODUCT: [Order(PRODUCT, 10001, 5), Order(PRODUCT, 9999, -5)]})
+
+    assert fills(backtester) == []
+    assert PRODUCT not in backtester.position
+
+
+@pytest.mark.parametrize('orders', [
+    [Order(PRODUCT, 10005, LIMIT + 1)],
+    # Buys are added up: either alone would fit
+    [Order(PRODUCT, 10005, 15), Order(PRODUCT, 10002, 10)],
+    # A sell past the limit cancels the buy that would have fit as well
+    [Order(PRODUCT, 10005, 5), Order(PRODUCT, 9995, -(LIMIT + 1))],
+])
+def test_orders_past_the_limit_are_all_cancelled(backtester, orders):
+    backtester.execute_orders({PRODUCT: orders})
+
+    assert fills(backtester) == []
+    assert PRODUCT not in backtester.position
+    assert PRODUCT not in backtester.cash
+
+
+def test_limit_counts_the_position_already_held(backtester):
+    backtester.execute_orders({PRODUCT: [Order(PRODUCT, 10005, 15)]})
+    backtester.get_next_market_state()
+    backtester.execute_orders({PRODUCT: [Order(PRODUCT, 10004, 6)]})
+
+    assert fills(backtester) == []
+    assert backtester.position[PRODUCT] == 15
+
+
+def test_profit_and_loss_marks_the_position_to_the_latest_mid(backtester):
+    backtester.execute_orders({PRODUCT: [Order(PRODUCT, 10005, 10), Order(PRODUCT, 9996, -1)]})
+    cash = -(4 * 10002 + 6 * 10005) + 9998
+    assert backtester.profit_and_loss() == {PRODUCT: cash + 9 * 10000.0}
+
+    backtester.get_next_market_state()
+    backtester.execute_orders({})
+    assert backtester.profit_and_loss() == {PRODUCT: cash + 9 * 10002.5}
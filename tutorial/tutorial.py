@@ -1,37 +1,84 @@
 import numpy as np
-import json
 from datamodel import Listing, Observation, Order, OrderDepth, ProsperityEncoder, Symbol, Trade, TradingState
+from json.encoder import encode_basestring_ascii
 from typing import Any
 
+DEBUG = 10
+INFO = 20
+WARNING = 30
+
 
 class Logger:
-    def __init__(self) -> None:
+    def __init__(self, level: int = INFO) -> None:
         self.logs = ""
         self.max_log_length = 3750
+        # log() drops messages below this level without formatting them
+        self.level = level
+        # Same output as json.dumps(value, cls=ProsperityEncoder, separators=(",", ":")), built once.
+        # What we encode is freshly built lists and dicts, so skip the check for reference cycles
+        self.encoder = ProsperityEncoder(separators=(",", ":"), check_circular=False)
 
     def print(self, *objects: Any, sep: str = " ", end: str = "\n") -> None:
         self.logs += sep.join(map(str, objects)) + end
 
+    def enabled(self, level: int) -> bool:
+        """
+        Whether a message at this level would show up in the next flush. flush
+        keeps less than a third of max_log_length of the logs, so once they
+        are that long anything more would be cut off anyway.
+        """
+        return level >= self.level and len(self.logs) < self.max_log_length // 3
+
+    def log(self, level: int, message: Any, *args: Any) -> None:
+        """
+        Like print, but nothing is formatted unless enabled(level): args are
+        %-formatted into message then, and a callable message is called for its text.
+        """
+        if not self.enabled(level):
+            return
+        if callable(message):
+            message = message()
+        elif args:
+            message = message % args
+        self.logs += str(message) + "\n"
+
+    def debug(self, message: Any, *args: Any) -> None:
+        self.log(DEBUG, message, *args)
+
+    def info(self, message: Any, *args: Any) -> None:
+        self.log(INFO, message, *args)
+
     def flush(self, state: TradingState, orders: dict[Symbol, list[Order]], conversions: int, trader_data: str) -> None:
-        base_length = len(self.to_json([
-            self.compress_state(state, ""),
+        # Everything but the three truncated strings is encoded in one go, laid
+        # out like compress_state without its traderData, and cut up around the
+        # places where the strings are spliced in afterwards
+        fixed = self.to_json([
+            state.timestamp,
+            [
+                self.compress_listings(state.listings),
+                self.compress_order_depths(state.order_depths),
+                self.compress_trades(state.own_trades),
+                self.compress_trades(state.market_trades),
+                state.position,
+                self.compress_observations(state.observations),
+            ],
             self.compress_orders(orders),
             conversions,
-            "",
-            "",
-        ]))
+        ])
+        comma = fixed.index(",")
+        head = "[" + fixed[:comma + 1]
+        middle = "," + fixed[comma + 2:-1] + ","
+        # Same as encoding the whole list with three empty strings ('""') and the comma between the last two
+        base_length = len(head) + len(middle) + 3 * 2 + 2
 
         # We truncate state.traderData, trader_data, and self.logs to the same max. length to fit the log limit
         max_item_length = (self.max_log_length - base_length) // 3
 
-        print(self.to_json([
-            self.compress_state(state, self.truncate(
-                state.traderData, max_item_length)),
-            self.compress_orders(orders),
-            conversions,
-            self.truncate(trader_data, max_item_length),
-            self.truncate(self.logs, max_item_length),
-        ]))
+        # The strings are quoted the way the encoder would (ensure_ascii), without
+        # the few microseconds each encode call spends setting up its C encoder
+        print(head + encode_basestring_ascii(self.truncate(state.traderData, max_item_length)) + middle +
+              encode_basestring_ascii(self.truncate(trader_data, max_item_length)) + "," +
+              encode_basestring_ascii(self.truncate(self.logs, max_item_length)) + "]")
 
         self.logs = ""
 
@@ -102,7 +149,7 @@ class Logger:
         return compressed
 
     def to_json(self, value: Any) -> str:
-        return json.dumps(value, cls=ProsperityEncoder, separators=(",", ":"))
+        return self.encoder.encode(value)
 
     def truncate(self, value: str, max_length: int) -> str:
         if len(value) <= max_length:
@@ -186,8 +233,8 @@ class Trader:
         return orders
 
     def run(self, state: TradingState):
-        self.logger.print("traderData: " + state.traderData)
-        self.logger.print("Observations: " + str(state.observations))
+        self.logger.debug("traderData: %s", state.traderData)
+        self.logger.debug("Observations: %s", state.observations)
         result = {}
 
         for product in state.order_depths: